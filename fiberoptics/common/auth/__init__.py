@@ -2,8 +2,9 @@
 
 import logging
 import os
+import tempfile
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Tuple
 
 from azure.identity import (
     AuthenticationRecord,
@@ -15,6 +16,13 @@ from azure.identity import (
 
 logger = logging.getLogger("fiberoptics.common")
 
+# Deserialized authentication records by filepath, stored together with the
+# signature of the file so that changes on disk are still picked up
+_authentication_records: Dict[Path, Tuple[Tuple[int, int, int], AuthenticationRecord]] = dict()
+
+# Whether caching is supported, by credential type and cache options
+_cache_availability: Dict[Tuple[type, str, bool], bool] = dict()
+
 
 def get_preferred_credential_type():
     use_browser_credentials = os.getenv("USE_BROWSER_CREDENTIALS", "false").lower() == "true"
@@ -44,6 +52,8 @@ class CredentialCache:
 
     """
 
+    __slots__ = ("persistence_options", "authentication_record_filepath", "identity_service_filepath")
+
     def __init__(self, name: str):
         allow_unencrypted_storage = os.getenv("ALLOW_UNENCRYPTED_STORAGE", "false").lower() == "true"
         self.persistence_options = TokenCachePersistenceOptions(
@@ -62,37 +72,93 @@ class CredentialCache:
         if not authentication_record or not self.is_cache_available():
             return None
 
-        return get_preferred_credential_type()(
-            authentication_record=authentication_record,
-            cache_persistence_options=self.persistence_options,
-        )
+        return self.create_credential(authentication_record=authentication_record)
+
+    def create_credential(self, **kwargs):
+        """Instantiates the preferred credential type using this cache."""
+        return get_preferred_credential_type()(**kwargs, cache_persistence_options=self.persistence_options)
 
     def remove_cached_credential(self):
         """Removes a cached credential object if it exists."""
+        _authentication_records.pop(self.authentication_record_filepath, None)
         os.remove(self.authentication_record_filepath)
         os.remove(self.identity_service_filepath)
 
     def is_cache_available(self):
-        """Checks whether caching is currently supported."""
-        try:
-            get_preferred_credential_type()(cache_persistence_options=self.persistence_options)
-            return True
-        except ValueError as e:
-            return not str(e).startswith("Cache encryption is impossible")
+        """Checks whether caching is currently supported.
+
+        Checking requires instantiating a credential, so the result is reused for
+        subsequent checks with the same credential type and cache options.
+
+        """
+        key = (
+            get_preferred_credential_type(),
+            self.persistence_options.name,
+            self.persistence_options.allow_unencrypted_storage,
+        )
+
+        if key not in _cache_availability:
+            try:
+                self.create_credential()
+                _cache_availability[key] = True
+            except ValueError as e:
+                _cache_availability[key] = not str(e).startswith("Cache encryption is impossible")
+
+        return _cache_availability[key]
 
     def read_authentication_record(self):
-        """Read an authentication record from file."""
+        """Read an authentication record from file.
+
+        The deserialized record is kept in memory and reused until the file changes.
+
+        """
+        filepath = self.authentication_record_filepath
+
         try:
-            with open(self.authentication_record_filepath, "r") as f:
-                return AuthenticationRecord.deserialize(f.read())
+            signature = _get_file_signature(filepath)
+            cached = _authentication_records.get(filepath)
+
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+            with open(filepath, "r") as f:
+                authentication_record = AuthenticationRecord.deserialize(f.read())
         except FileNotFoundError:
+            _authentication_records.pop(filepath, None)
             return None
 
+        _authentication_records[filepath] = (signature, authentication_record)
+        return authentication_record
+
     def write_authentication_record(self, authentication_record: AuthenticationRecord):
-        """Write an authentication record to file."""
-        os.makedirs(self.authentication_record_filepath.parent, exist_ok=True)
-        with open(self.authentication_record_filepath, "w") as f:
-            f.write(authentication_record.serialize())
+        """Write an authentication record to file.
+
+        The record is written to a temporary file which then replaces the existing
+        file, so that readers never see a partially written record.
+
+        """
+        filepath = self.authentication_record_filepath
+        os.makedirs(filepath.parent, exist_ok=True)
+        f = tempfile.NamedTemporaryFile(mode="w", dir=filepath.parent, delete=False)
+
+        try:
+            with f:
+                f.write(authentication_record.serialize())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(f.name, filepath)
+        except Exception:
+            os.remove(f.name)
+            raise
+
+        # Updated directly, as the modification time may not change between two writes
+        _authentication_records[filepath] = (_get_file_signature(filepath), authentication_record)
+
+
+def _get_file_signature(filepath: Path) -> Tuple[int, int, int]:
+    """The modification time, size and inode of a file, which change when it is rewritten."""
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
 
 
 def add_default_scopes(credential: DeviceCodeCredential, scopes: List[str]):
@@ -115,7 +181,9 @@ def add_default_scopes(credential: DeviceCodeCredential, scopes: List[str]):
         The credential is modified in place.
 
     """
-    credential.get_token = lambda *args, **kwargs: type(credential).get_token(credential, *(args or scopes), **kwargs)
+    get_token = type(credential).get_token
+    default_scopes = tuple(scopes)
+    credential.get_token = lambda *args, **kwargs: get_token(credential, *(args or default_scopes), **kwargs)
 
 
 def get_default_credential(name: str = None, scopes: List[str] = [], **kwargs):
@@ -144,7 +212,6 @@ def get_default_credential(name: str = None, scopes: List[str] = [], **kwargs):
         credential = ClientSecretCredential(**kwargs)
     else:
         cache = CredentialCache(name) if name else None
-        CredentialType = get_preferred_credential_type()
 
         if cache and cache.is_cache_available():
             authentication_record = cache.read_authentication_record()
@@ -155,20 +222,14 @@ def get_default_credential(name: str = None, scopes: List[str] = [], **kwargs):
 {cache.authentication_record_filepath}..."
                 )
                 # Retrieve cached credentials
-                credential = CredentialType(
-                    authentication_record=authentication_record,
-                    cache_persistence_options=cache.persistence_options,
-                )
+                credential = cache.create_credential(authentication_record=authentication_record)
             else:
                 # Instantiate credentials with cache options
-                credential = CredentialType(
-                    **kwargs,
-                    cache_persistence_options=cache.persistence_options,
-                )
+                credential = cache.create_credential(**kwargs)
                 authentication_record = credential.authenticate(scopes=scopes)
                 cache.write_authentication_record(authentication_record)
         else:
-            credential = CredentialType(**kwargs)
+            credential = get_preferred_credential_type()(**kwargs)
             # Prompt the user for a device code immediately
             credential.authenticate(scopes=scopes)
 
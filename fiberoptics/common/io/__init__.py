@@ -1,8 +1,10 @@
 """Filesystem-related functions such as reading and writing HDF files."""
 
 import os
+from typing import Optional
 
 import h5py
+import numpy as np
 import pandas as pd
 
 
@@ -14,11 +16,49 @@ def get_filepaths(folder):
     folder : str
         Path to a given folder.
 
+    Returns
+    -------
     list, of type str
         Containing paths to all files in the given folder.
 
     """
-    return [os.path.join(dp, f) for dp, ds, fs in os.walk(folder) for f in fs]
+    return list(iter_filepaths(folder))
+
+
+def iter_filepaths(folder):
+    """Lazily yields all filepaths in the given folder and its subfolders.
+
+    Parameters
+    ----------
+    folder : str
+        Path to a given folder.
+
+    Yields
+    ------
+    str
+        Path to a file in the given folder.
+
+    """
+    stack = [folder]
+    while stack:
+        # Mirror `os.walk`, which skips folders that cannot be listed
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        subfolders = []
+        with entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    yield entry.path
+                elif not entry.is_symlink():
+                    subfolders.append(entry.path)
+        # Reversed so that subfolders are visited in the same order as `os.walk`
+        stack.extend(reversed(subfolders))
 
 
 def read_hdf(filepath: str):
@@ -37,15 +77,24 @@ def read_hdf(filepath: str):
     """
     with h5py.File(filepath, mode="r") as file:
         df = pd.DataFrame(
-            data=file["values"],
-            index=pd.DatetimeIndex(file["index"], tz="UTC"),
-            columns=file["columns"],
+            data=_read_dataset(file["values"]),
+            index=pd.DatetimeIndex(_read_dataset(file["index"]), tz="UTC"),
+            columns=_read_dataset(file["columns"]),
+            copy=False,
         )
         df.index.freq = df.index.inferred_freq
         metadata = dict(file.attrs)
         return df, metadata
 
 
+def _read_dataset(dataset: h5py.Dataset):
+    """Reads a dataset directly into a pre-allocated array, avoiding intermediate copies."""
+    array = np.empty(dataset.shape, dtype=dataset.dtype)
+    if array.size:
+        dataset.read_direct(array)
+    return array
+
+
 def read_hdf_metadata(filepath: str):
     """Read metadata from HDF file.
 
@@ -64,7 +113,7 @@ def read_hdf_metadata(filepath: str):
         return dict(file.attrs)
 
 
-def write_hdf(filepath: str, df: pd.DataFrame, metadata: dict):
+def write_hdf(filepath: str, df: pd.DataFrame, metadata: dict, compression: Optional[str] = None):
     """Write dataframe and metadata to HDF file.
 
     Parameters
@@ -75,11 +124,22 @@ def write_hdf(filepath: str, df: pd.DataFrame, metadata: dict):
         The dataframe to write.
     metadata : dict
         Metadata to add as file attributes.
+    compression : str, optional
+        The compression filter applied to the values, e.g. "gzip" or "lzf".
+        Note that "lzf" is only readable through h5py, while "gzip" is supported by
+        all HDF5 readers. The values are stored uncompressed by default.
 
     """
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
     with h5py.File(filepath, mode="w") as file:
-        file.create_dataset("values", data=df.values)
+        file.create_dataset(
+            "values",
+            data=df.values,
+            # Filters require chunked storage, otherwise the values are stored contiguously
+            chunks=True if compression is not None else None,
+            compression=compression,
+            shuffle=compression is not None,
+        )
         file.create_dataset("index", data=df.index.view(int))
         file.create_dataset("columns", data=df.columns)
         for k, v in metadata.items():
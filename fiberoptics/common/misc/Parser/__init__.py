@@ -6,11 +6,16 @@ import re
 import typing
 import uuid
 
+import numpy as np
 import pandas as pd
 
 _T = typing.TypeVar("_T")
 _R = typing.TypeVar("_R")
 
+_CAMEL_CASE_WORD_PATTERN = re.compile("[A-Z]?[a-z]+")
+_UUID_PATTERN = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\Z")
+_CANONICAL_UUID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\Z")
+
 
 def auto_parse(types: typing.Dict[str, typing.Type] = {}):
     """Function decorator to perform automatic parsing of input arguments.
@@ -28,11 +33,14 @@ def auto_parse(types: typing.Dict[str, typing.Type] = {}):
         keys = list(signature.parameters)
         types_ = {k: v.annotation for k, v in signature.parameters.items()}
         types_.update(types)
+        parsers = {k: _get_parser(v) for k, v in types_.items()}
+        positional_parsers = tuple(parsers[k] for k in keys)
 
         @functools.wraps(fn)
         def fn_with_auto_parse(*args, **kwargs):
-            args = tuple(parse_type(v, types_[k]) for k, v in zip(keys, args))
-            kwargs = {k: parse_type(v, types_[k]) for k, v in kwargs.items()}
+            args = [parse(v) for parse, v in zip(positional_parsers, args)]
+            if kwargs:
+                kwargs = {k: parsers[k](v) for k, v in kwargs.items()}
             return fn(*args, **kwargs)
 
         return fn_with_auto_parse
@@ -66,18 +74,12 @@ def parse_type(value: typing.Any, Type: _T) -> _T:
         If the target type is ambiguous or the value cannot be parsed to the given type.
 
     """
-    if Type == "ignore" or Type == inspect._empty:
-        return value
-    if Type == bool:
-        return parse_bool(value)
-    if Type == int:
-        return parse_int(value)
-    if Type == str:
-        return parse_str(value)
-    if Type == uuid.UUID:
-        return parse_uuid(value)
-    if Type == pd.Timestamp:
-        return parse_time(value)
+    try:
+        parser = _PARSERS.get(Type)
+    except TypeError:  # Unhashable types cannot have a dedicated parser
+        parser = None
+    if parser is not None:
+        return parser(value)
     if hasattr(Type, "__annotations__") and isinstance(value, dict):
         return {k: parse_type(v, Type.__annotations__[k]) for k, v in value.items()}
 
@@ -112,6 +114,52 @@ def parse_type(value: typing.Any, Type: _T) -> _T:
         raise ValueError(f"Failed to parse value '{value}' of type '{Type}'")
 
 
+def _get_parser(Type: typing.Type[_T]) -> typing.Callable[[typing.Any], _T]:
+    """Resolves the parser for a given type once, so that it can be reused.
+
+    The returned parser is equivalent to `lambda value: parse_type(value, Type)`.
+
+    """
+    try:
+        parser = _PARSERS.get(Type)
+    except TypeError:  # Unhashable types cannot have a dedicated parser
+        parser = None
+    if parser is not None:
+        return parser
+
+    origin = typing.get_origin(Type)
+    args = typing.get_args(Type)
+
+    if typing.is_typeddict(Type):
+        item_parsers = {k: _get_parser(v) for k, v in Type.__annotations__.items()}
+
+        def parse_typed_dict(value):
+            if isinstance(value, dict):
+                return {k: item_parsers[k](v) for k, v in value.items()}
+            return parse_type(value, Type)
+
+        return parse_typed_dict
+
+    # Other annotated classes depend on the value, and are left to `parse_type`
+    if not hasattr(Type, "__annotations__"):
+        if origin == typing.Union and len(args) == 2 and args[1] == type(None):  # noqa: E721
+            parse_actual = _get_parser(args[0])
+            return lambda value: parse_optional(value, parse_actual)
+        if origin == typing.Literal:
+
+            def parse_literal(value):
+                if value in args:
+                    return value
+                raise ValueError(f"Expected one of {args} but got '{value}'")
+
+            return parse_literal
+        if origin == list and len(args):
+            parse_item = _get_parser(args[0])
+            return lambda value: [parse_item(item) for item in value]
+
+    return lambda value: parse_type(value, Type)
+
+
 def parse_bool(value: bool):
     """Parses boolean input values.
 
@@ -132,7 +180,8 @@ def parse_bool(value: bool):
         If the input is not explicitly of boolean type.
 
     """
-    if not isinstance(value, bool):
+    # `bool` cannot be subclassed, so its two singletons are the only valid values
+    if value is not True and value is not False:
         raise ValueError("Boolean arguments must be either `True` or `False`")
     return value
 
@@ -223,7 +272,10 @@ def parse_time(value: typing.Union[str, int, pd.Timestamp]):
         Timezone is set to UTC if undefined.
 
     """
-    time = pd.Timestamp(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        # Nanoseconds since UNIX epoch can be interpreted as UTC directly
+        return pd.Timestamp(value, tz="UTC")
+    time = value if type(value) is pd.Timestamp else pd.Timestamp(value)
     if time.tz is None:
         return time.tz_localize("UTC")
     return time
@@ -269,7 +321,27 @@ def parse_uuid(value: typing.Any) -> str:
         If the input value is not a valid UUID.
 
     """
-    return str(uuid.UUID(str(value)))
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, str) and _CANONICAL_UUID_PATTERN.match(value):
+        return value
+    return str(uuid.UUID(value if isinstance(value, str) else str(value)))
+
+
+def _identity(value: _T) -> _T:
+    return value
+
+
+# Dedicated parsers by type, checked before any generic type handling
+_PARSERS = {
+    "ignore": _identity,
+    inspect._empty: _identity,
+    bool: parse_bool,
+    int: parse_int,
+    str: parse_str,
+    uuid.UUID: parse_uuid,
+    pd.Timestamp: parse_time,
+}
 
 
 def is_valid_uuid(value: typing.Any) -> bool:
@@ -286,13 +358,20 @@ def is_valid_uuid(value: typing.Any) -> bool:
         True if the input is a valid UUID and false otherwise.
 
     """
+    if isinstance(value, uuid.UUID) or (isinstance(value, str) and _UUID_PATTERN.match(value)):
+        return True
+    # Mirror the normalization in `uuid.UUID` to reject wrong lengths without raising
+    text = value if isinstance(value, str) else str(value)
+    if len(text.replace("urn:", "").replace("uuid:", "").strip("{}").replace("-", "")) != 32:
+        return False
     try:
-        parse_uuid(value)
+        parse_uuid(text)
         return True
     except ValueError:
         return False
 
 
+@functools.lru_cache(maxsize=1024)
 def to_snake_case(camelCase: str):
     """Converts camel case API naming conventions to snake case.
 
@@ -307,7 +386,7 @@ def to_snake_case(camelCase: str):
         The string converted to snake case, e.g. 'profile_id'.
 
     """
-    return "_".join(re.findall("[A-Z]?[a-z]+", camelCase)).lower()
+    return "_".join(_CAMEL_CASE_WORD_PATTERN.findall(camelCase)).lower()
 
 
 def to_camel_case(snake_case: str):
@@ -326,6 +405,7 @@ def to_camel_case(snake_case: str):
         The 'snake_case' string converted to camelCase
     """
 
-    s = "".join([x.title() for x in snake_case.split("_")])
+    # Underscores are word boundaries for `str.title`, so the words can be title-cased in one pass
+    s = snake_case.title().replace("_", "")
 
-    return s[:1].lower() if len(s) <= 1 else s[0].lower() + s[1:]
+    return s[:1].lower() + s[1:]
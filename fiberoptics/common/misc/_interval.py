@@ -1,10 +1,33 @@
+import bisect
+import collections
+import contextlib
 import functools
+import os
 import re
+import threading
+import warnings
 from typing import Callable, List, Union
 
+import numpy as np
 import pandas as pd
 
 
+def _get_max_cached_rows(default: int = 10_000_000) -> int:
+    """Reads the default cache size from the environment, ignoring malformed values."""
+    try:
+        return int(os.getenv("INTERVAL_CACHE_MAX_ROWS", default))
+    except ValueError:
+        warnings.warn(f"Ignoring invalid INTERVAL_CACHE_MAX_ROWS, using {default}")
+        return default
+
+
+_MAX_CACHED_ROWS = _get_max_cached_rows()
+
+_INTERVAL_DTYPE_PATTERN = re.compile(r"interval\[(.+), (.+)\]")
+_DATETIME_TZ_PATTERN = re.compile(r"datetime64\[ns, (.+)\]")
+_NO_END_POINTS = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+
 def find_continuous_intervals(intervals: pd.IntervalIndex, threshold=0) -> List[pd.IntervalIndex]:
     """Splits a list of intervals into multiple lists of continuous intervals.
 
@@ -23,21 +46,13 @@ def find_continuous_intervals(intervals: pd.IntervalIndex, threshold=0) -> List[
         A list of continuous intervals.
 
     """
-    intervals = pd.IntervalIndex(intervals).sort_values()
+    intervals = _sort_intervals(pd.IntervalIndex(intervals))
 
     if intervals.empty:
         return list()
 
-    if "datetime" in str(intervals.dtype):
-        threshold = pd.Timedelta(threshold)
-
-    right_sorted = intervals.sort_values(key=lambda x: getattr(x, "right", x))
-    left_continuous = intervals.left[1:] - intervals.right[:-1] <= threshold
-    right_continuous = right_sorted.left[1:] - right_sorted.right[:-1] <= threshold
-    # Give each interval a number, where continuous intervals have the same number
-    groups = [0, *(~(left_continuous | right_continuous)).cumsum()]
-    # Group by the given numbers and transform each group to an IntervalIndex
-    return list(intervals.to_series().groupby(groups).agg(list).map(pd.IntervalIndex))
+    splits = _find_continuity_breaks(intervals, threshold)
+    return [intervals[start:stop] for start, stop in zip([0, *splits], [*splits, len(intervals)])]
 
 
 def combine_continuous_intervals(intervals: pd.IntervalIndex, threshold=0):
@@ -59,17 +74,129 @@ def combine_continuous_intervals(intervals: pd.IntervalIndex, threshold=0):
         The length of the returned index is smaller or equal to the input index.
 
     """
-    # Convert the IntervalIndex to a list of continuous IntervalIndex objects
-    result = find_continuous_intervals(intervals, threshold)
-    # Convert each IntervalIndex object to a tuple with its end points and back into
-    # an IntervalIndex with correct type
-    return pd.IntervalIndex.from_tuples(
-        [(min(x.left), max(x.right)) for x in result],
+    intervals = _sort_intervals(pd.IntervalIndex(intervals))
+
+    if intervals.empty:
+        return intervals
+
+    # Each group of continuous intervals starts with its smallest left end point
+    starts = np.r_[0, _find_continuity_breaks(intervals, threshold)]
+    left, right = _get_end_points(intervals)
+    return pd.IntervalIndex.from_arrays(
+        left[starts],
+        np.maximum.reduceat(right, starts),
         closed=intervals.closed,
         dtype=intervals.dtype,
     )
 
 
+def _get_end_points(intervals: pd.IntervalIndex):
+    """Returns the end points of the intervals as numpy arrays.
+
+    Datetime-like end points are returned as int64 nanoseconds since UNIX epoch, which
+    `IntervalIndex.from_arrays` converts back when given the original dtype.
+
+    """
+    left, right = intervals.left, intervals.right
+
+    if isinstance(left, (pd.DatetimeIndex, pd.TimedeltaIndex)):
+        return left.asi8, right.asi8
+
+    return left.to_numpy(), right.to_numpy()
+
+
+def _append_intervals(index: pd.IntervalIndex, other: pd.IntervalIndex) -> pd.IntervalIndex:
+    """Appends intervals of the same dtype like `append`, but on the numeric end points.
+
+    Appending time zone aware intervals with `append` boxes every end point as a timestamp.
+
+    """
+    left, right = _get_end_points(index)
+    other_left, other_right = _get_end_points(other)
+    return pd.IntervalIndex.from_arrays(
+        np.r_[left, other_left],
+        np.r_[right, other_right],
+        closed=index.closed,
+        dtype=index.dtype,
+    )
+
+
+def _sort_intervals(intervals: pd.IntervalIndex) -> pd.IntervalIndex:
+    """Sorts intervals like `sort_values`, but on the numeric end points.
+
+    Sorting time zone aware intervals with `sort_values` compares boxed timestamps.
+
+    """
+    left, right = _get_end_points(intervals)
+    return intervals.take(np.lexsort((right, left)))
+
+
+def _find_continuity_breaks(intervals: pd.IntervalIndex, threshold) -> np.ndarray:
+    """Returns the positions where sorted intervals stop being continuous.
+
+    An interval is continuous with the preceding intervals if it starts within
+    `threshold` of the largest right end point seen so far.
+
+    """
+    left, right = _get_end_points(intervals)
+
+    if isinstance(intervals.left, (pd.DatetimeIndex, pd.TimedeltaIndex)):
+        threshold = pd.Timedelta(threshold).value
+
+    return np.flatnonzero(left[1:] - np.maximum.accumulate(right[:-1]) > threshold) + 1
+
+
+def _subtract_end_points(left: np.ndarray, right: np.ndarray, other_left: np.ndarray, other_right: np.ndarray):
+    """Subtract the intervals `other_left` to `other_right` from the intervals `left` to `right`.
+
+    Both sets of intervals must be sorted and contain no overlapping intervals, as is the
+    case for the output of `_combine_end_points`. The result is found in a single pass by
+    intersecting the intervals with the gaps between the intervals in `other`. Empty
+    intervals are dropped, whether or not there is anything to subtract.
+
+    """
+    nonempty = left < right
+    left, right = left[nonempty], right[nonempty]
+    if not len(left) or not len(other_left):
+        return left, right
+
+    # Only the intervals in `other` within the range of the intervals can overlap them
+    start = np.searchsorted(other_right, left[0], side="left")
+    stop = np.searchsorted(other_left, right[-1], side="right")
+    other_left, other_right = other_left[start:stop], other_right[start:stop]
+
+    if not len(other_left):
+        return left, right
+
+    # The gaps in `other`, where the outermost gaps are extended to cover the intervals
+    gap_left = np.r_[min(left[0], other_left[0]), other_right]
+    gap_right = np.r_[other_left, max(right[-1], other_right[-1])]
+
+    # Find the range of gaps overlapping each interval and intersect them
+    first = np.searchsorted(gap_right, left, side="right")
+    last = np.searchsorted(gap_left, right, side="left")
+    counts = np.maximum(last - first, 0)
+    interval_positions = np.repeat(np.arange(len(left)), counts)
+    gap_positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - first, counts)
+    result_left = np.maximum(left[interval_positions], gap_left[gap_positions])
+    result_right = np.minimum(right[interval_positions], gap_right[gap_positions])
+    nonempty = result_left < result_right
+
+    return result_left[nonempty], result_right[nonempty]
+
+
+def _combine_end_points(left: np.ndarray, right: np.ndarray):
+    """Combines continuous (or overlapping) intervals, given their end points.
+
+    The numeric counterpart of `combine_continuous_intervals` with a threshold of zero.
+
+    """
+    order = np.lexsort((right, left))
+    left, right = left[order], right[order]
+    starts = np.r_[0, np.flatnonzero(left[1:] > np.maximum.accumulate(right[:-1])) + 1]
+    return left[starts], np.maximum.reduceat(right, starts)
+
+
 def add_interval(index: pd.IntervalIndex, other: pd.Interval):
     """Add an interval to a continuous interval index.
 
@@ -98,7 +225,26 @@ def add_interval(index: pd.IntervalIndex, other: pd.Interval):
 
     """
     other = pd.IntervalIndex([other], dtype=index.dtype)
-    return combine_continuous_intervals(index.append(other))
+    left, right = _get_end_points(index)
+    other_left, other_right = _get_end_points(other)
+
+    # Indexes which are not sorted and separated by gaps are combined from scratch
+    if not (np.all(left[1:] > right[:-1]) and np.all(left <= right)):
+        return combine_continuous_intervals(_append_intervals(index, other))
+
+    # Find the range of intervals continuous with `other` and merge them into it
+    start = np.searchsorted(right, other_left[0], side="left")
+    stop = np.searchsorted(left, other_right[0], side="right")
+    if start < stop:
+        other_left = np.minimum(other_left, left[start])
+        other_right = np.maximum(other_right, right[stop - 1])
+
+    return pd.IntervalIndex.from_arrays(
+        np.r_[left[:start], other_left, left[stop:]],
+        np.r_[right[:start], other_right, right[stop:]],
+        closed=index.closed,
+        dtype=index.dtype,
+    )
 
 
 def subtract_interval(index: pd.IntervalIndex, other: pd.Interval):
@@ -128,61 +274,172 @@ def subtract_interval(index: pd.IntervalIndex, other: pd.Interval):
         The new index after subtracting the interval.
 
     """
+    left, right = _get_end_points(index)
+    other_left, other_right = _get_end_points(pd.IntervalIndex([other], dtype=index.dtype))
+    overlaps = index.overlaps(other)
 
-    def generator():
-        for interval in index:
-            if not interval.overlaps(other):
-                yield interval
-            else:
-                if interval.left < other.left:
-                    yield pd.Interval(interval.left, other.left)
-                if other.right < interval.right:
-                    yield pd.Interval(other.right, interval.right)
+    # Each interval is either kept as is, or replaced by the parts on the left and/or
+    # right side of `other`. Masking row by row keeps the order of the index.
+    lefts = np.column_stack([left, left, np.broadcast_to(other_right, left.shape)])
+    rights = np.column_stack([right, np.broadcast_to(other_left, right.shape), right])
+    mask = np.column_stack([~overlaps, overlaps & (left < other_left), overlaps & (other_right < right)])
 
-    return pd.IntervalIndex(list(generator()))
+    return pd.IntervalIndex.from_arrays(lefts[mask], rights[mask], closed=index.closed, dtype=index.dtype)
 
 
-def with_interval_cache(get_data_function: Callable):
-    """Wraps a `get_data_function` with cache functionality.
+def _insert_sorted(frames: List[pd.DataFrame], others: List[pd.DataFrame]) -> List[pd.DataFrame]:
+    """Insert `others` into a list of dataframes sorted by index, without copying data.
 
-    Should only be used when you expect to request the same or overlapping intervals.
-    The decorator makes sure you only request the missing data. E.g. when requesting
-    data for the period [3, 4) and then [2, 5), the last request is transformed into
-    two requests, namely [2, 3) and [4, 5).
+    None of the dataframes may overlap, which holds for data fetched for intervals that
+    are missing from the cache. Empty dataframes are only kept if there is nothing else,
+    to preserve the columns and index type of the fetched data.
 
     """
+    # Only a single empty dataframe is ever kept, so there is no need to check them all
+    frames = [] if frames and frames[0].empty else list(frames)
 
-    cached_intervals = dict()
-    cached_data = dict()
+    for other in others:
+        if other.empty:
+            continue
+        if not other.index.is_monotonic_increasing:
+            other = other.sort_index()
+        position = bisect.bisect_right(frames, other.index[0], key=lambda frame: frame.index[0])
+        frames.insert(position, other)
 
-    @functools.wraps(get_data_function)
-    def wrapped_function(id_or_ids: Union[str, List[str]], start_time: pd.Timestamp, end_time: pd.Timestamp, **kwargs):
-        ids = [id_or_ids] if isinstance(id_or_ids, str) else id_or_ids
-        start_time = pd.Timestamp(start_time)
-        end_time = pd.Timestamp(end_time)
-        missing_intervals = pd.IntervalIndex.from_tuples([(start_time, end_time)])
-        dtype = missing_intervals.dtype  # Use the same time zone
+    return frames or others[-1:]
 
-        for id in ids:
-            if id not in cached_intervals:
-                cached_intervals[id] = pd.IntervalIndex([], dtype=dtype)
-                cached_data[id] = pd.DataFrame()
 
-            for interval in cached_intervals[id]:
-                missing_intervals = subtract_interval(missing_intervals, interval)
+def _slice_sorted(frames: List[pd.DataFrame], start, end) -> pd.DataFrame:
+    """Slice the rows from `start` to `end` of a sorted list of dataframes.
 
-            for interval in missing_intervals:
-                df = get_data_function(id, interval.left, interval.right, **kwargs)
-                cached_intervals[id] = add_interval(cached_intervals[id], interval)
-                cached_data[id] = pd.concat([cached_data[id], df]).sort_index()
+    Equivalent to slicing the concatenated dataframes, but only the dataframes within
+    the slice are concatenated.
 
-        # Multi-level column-index is only returned if a list of ids is given
-        if isinstance(id_or_ids, str):
-            return cached_data[id_or_ids][start_time:end_time]
+    """
+    if not frames:  # Nothing has been fetched, e.g. if only empty intervals were requested
+        return pd.DataFrame()
+    if frames[0].empty:
+        return frames[0][start:end]
 
-        return pd.concat([cached_data[id][start_time:end_time] for id in ids], axis=1, keys=ids)
+    first = bisect.bisect_left(frames, start, key=lambda frame: frame.index[-1])
+    stop = bisect.bisect_right(frames, end, key=lambda frame: frame.index[0])
+    return pd.concat([frame[start:end] for frame in frames[first:stop]] or [frames[0].iloc[:0]])
 
-    return wrapped_function
+
+def with_interval_cache(get_data_function: Callable = None, max_rows: int = _MAX_CACHED_ROWS):
+    """Wraps a `get_data_function` with cache functionality.
+
+    Should only be used when you expect to request the same or overlapping intervals.
+    The decorator makes sure you only request the missing data. E.g. when requesting
+    data for the period [3, 4) and then [2, 5), the last request is transformed into
+    two requests, namely [2, 3) and [4, 5). The cache is thread-safe, and concurrent
+    requests for the same id share a single call to `get_data_function`.
+
+    Parameters
+    ----------
+    get_data_function : callable
+        The function to wrap, with signature `(id, start_time, end_time, **kwargs)`.
+    max_rows : int, optional
+        The maximum number of cached rows. The least recently used ids are evicted
+        once exceeded. Defaults to the `INTERVAL_CACHE_MAX_ROWS` environment variable
+        or 10 million.
+
+    """
+
+    def decorator(get_data_function: Callable):
+        # The cached intervals of each id are kept as sorted int64 end points
+        cached_intervals = collections.OrderedDict()
+        cached_data = collections.OrderedDict()
+        cached_rows = dict()
+        cache_lock = threading.Lock()
+        # Locks are kept while their id is cached or used by a request, counted by `id_users`
+        id_locks = collections.defaultdict(threading.Lock)
+        id_users = collections.Counter()
+
+        @contextlib.contextmanager
+        def hold_id_lock(id):
+            with cache_lock:
+                id_lock = id_locks[id]
+                id_users[id] += 1
+            try:
+                with id_lock:
+                    yield
+            finally:
+                with cache_lock:
+                    id_users[id] -= 1
+                    if not id_users[id]:
+                        del id_users[id]
+                        # The id may have been evicted, or never cached if fetching failed
+                        if id not in cached_data:
+                            del id_locks[id]
+
+        @functools.wraps(get_data_function)
+        def wrapped_function(id_or_ids: Union[str, List[str]], start_time: pd.Timestamp, end_time: pd.Timestamp, **kwargs):
+            ids = [id_or_ids] if isinstance(id_or_ids, str) else id_or_ids
+            start_time = start_time if type(start_time) is pd.Timestamp else pd.Timestamp(start_time)
+            end_time = end_time if type(end_time) is pd.Timestamp else pd.Timestamp(end_time)
+            pd.Interval(start_time, end_time)  # Validates the order and time zones
+            requested_left, requested_right = np.array([start_time.value]), np.array([end_time.value])
+            results = dict()
+
+            for id in ids:
+                # Concurrent requests for the same id wait here and reuse the fetched data
+                with hold_id_lock(id):
+                    with cache_lock:
+                        left, right = cached_intervals.get(id, _NO_END_POINTS)
+                        frames = cached_data.get(id, [])
+
+                    missing_left, missing_right = _subtract_end_points(requested_left, requested_right, left, right)
+
+                    # Missing intervals are requested in the time zone of the request
+                    fetched_data = [
+                        get_data_function(
+                            id, pd.Timestamp(start, tz=start_time.tz), pd.Timestamp(end, tz=start_time.tz), **kwargs
+                        )
+                        for start, end in zip(missing_left.tolist(), missing_right.tolist())
+                    ]
+
+                    if fetched_data:
+                        left, right = _combine_end_points(np.r_[left, missing_left], np.r_[right, missing_right])
+                        frames = _insert_sorted(frames, fetched_data)
+
+                    with cache_lock:
+                        # Counted from the stored frames, as the id may have been evicted during the fetch
+                        cached_rows[id] = sum(len(df) for df in frames)
+                        cached_intervals[id] = (left, right)
+                        cached_data[id] = frames
+                        cached_intervals.move_to_end(id)
+                        cached_data.move_to_end(id)
+
+                results[id] = frames
+
+            # Evict the least recently used ids, but never the ones just requested
+            with cache_lock:
+                num_rows = sum(cached_rows.values())
+                for id in list(cached_data):
+                    if num_rows <= max_rows:
+                        break
+                    if id in results:
+                        continue
+                    cached_intervals.pop(id)
+                    cached_data.pop(id)
+                    num_rows -= cached_rows.pop(id)
+                    # A lock in use is removed once its last user is done with it
+                    if id not in id_users:
+                        id_locks.pop(id, None)
+
+            # Multi-level column-index is only returned if a list of ids is given
+            if isinstance(id_or_ids, str):
+                return _slice_sorted(results[id_or_ids], start_time, end_time)
+
+            return pd.concat([_slice_sorted(results[id], start_time, end_time) for id in ids], axis=1, keys=ids)
+
+        return wrapped_function
+
+    if callable(get_data_function):
+        return decorator(get_data_function)
+
+    return decorator
 
 
 def serialize_interval_index(intervals: pd.IntervalIndex):
@@ -234,12 +491,15 @@ def serialize_interval_index(intervals: pd.IntervalIndex):
         right = intervals.right
 
         if "datetime" in dtype:
-            left = left.view("int64")
-            right = right.view("int64")
+            left = left.asi8
+            right = right.asi8
 
-        return dict(left=list(left), right=list(right), dtype=dtype)
+        return dict(left=left.tolist(), right=right.tolist(), dtype=dtype)
 
-    for serialization_method in [serialize_range, serialize_arrays]:
+    # Only try the range representation if it can possibly be identical to the input
+    serialization_methods = [serialize_range, serialize_arrays] if _is_uniform(intervals) else [serialize_arrays]
+
+    for serialization_method in serialization_methods:
         serialized = serialization_method()
         deserialized = deserialize_interval_index(serialized)
         try:
@@ -251,6 +511,22 @@ def serialize_interval_index(intervals: pd.IntervalIndex):
     raise ValueError("Serialization failed")
 
 
+def _is_uniform(intervals: pd.IntervalIndex) -> bool:
+    """Checks whether the intervals are adjacent and of equal length.
+
+    Float intervals are always considered uniform, since a range of floats may contain
+    rounding errors and has to be verified anyway.
+
+    """
+    left, right = _get_end_points(intervals)
+
+    if left.dtype.kind == "f":
+        return True
+
+    lengths = right - left
+    return bool(np.all(lengths == lengths[0]) and np.all(left[1:] == right[:-1]))
+
+
 def deserialize_interval_index(serialized: dict):
     """Deserialize a serialized interval index.
 
@@ -279,12 +555,12 @@ def deserialize_interval_index(serialized: dict):
 
     """
     # Extract information from the interval index dtype
-    match = re.match(r"interval\[(.+), (.+)\]", serialized["dtype"])
+    match = _INTERVAL_DTYPE_PATTERN.match(serialized["dtype"])
     dtype = match.group(1)
     closed = match.group(2)
 
     # Try to extract timezone information
-    match = re.match(r"datetime64\[ns, (.+)\]", dtype)
+    match = _DATETIME_TZ_PATTERN.match(dtype)
     tz = match.group(1) if match is not None else None
 
     def deserialize_range():
@@ -293,13 +569,13 @@ def deserialize_interval_index(serialized: dict):
         freq = serialized["freq"]
 
         if dtype.startswith("datetime"):
-            start = pd.Timestamp(start)
-            end = pd.Timestamp(end)
-            freq = pd.Timedelta(freq)
+            # Generate the nanosecond breaks directly instead of going through `date_range`
+            breaks = pd.DatetimeIndex(np.arange(start, end + 1, freq, dtype=np.int64).view("M8[ns]"))
 
             if tz is not None:
-                start = start.tz_localize("UTC").tz_convert(tz)
-                end = end.tz_localize("UTC").tz_convert(tz)
+                breaks = breaks.tz_localize("UTC").tz_convert(tz)
+
+            return pd.IntervalIndex.from_breaks(breaks, closed=closed)
 
         return pd.interval_range(start, end, freq=freq, closed=closed)
 
@@ -1,3 +1,14 @@
+import functools
+import operator
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_version_string(version: str) -> tuple:
+    # Split `version` assuming it is formatted as "1.2.3"
+    major, minor, patch = version.split(".")
+    return int(major), int(minor), int(patch)
+
+
 class SemanticVersion(tuple):
     """Parses a (semantic) version number given by `major.minor.patch`.
 
@@ -13,28 +24,21 @@ class SemanticVersion(tuple):
 
     """
 
-    major: int
-    minor: int
-    patch: int
+    __slots__ = ()
+
+    major: int = property(operator.itemgetter(0))
+    minor: int = property(operator.itemgetter(1))
+    patch: int = property(operator.itemgetter(2))
 
     def __new__(cls, major, minor=0, patch=0):
         if isinstance(major, str):
-            # Split `major` assuming it is formatted as "1.2.3"
-            major = major.split(".")
-
+            return super().__new__(cls, _parse_version_string(major))
         if not isinstance(major, int):
             # Unpack `major` assuming it is an iterable such as (1,2,3)
             major, minor, patch = major
 
         # Convert to integers, raising TypeError if it fails
-        major, minor, patch = int(major), int(minor), int(patch)
-
-        return super().__new__(cls, (major, minor, patch))
-
-    def __init__(self, major, minor=0, patch=0):
-        super().__init__()
-        # Ignore input and use the already parsed `self`
-        self.major, self.minor, self.patch = self
+        return super().__new__(cls, (int(major), int(minor), int(patch)))
 
     def __repr__(self) -> str:
         return f"{type(self).__name__}(major={self.major}, minor={self.minor}, patch={self.patch})"
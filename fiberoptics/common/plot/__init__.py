@@ -1,8 +1,8 @@
 """Powerful plotting functions for ease-of-use."""
 
+import typing
 import warnings
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
@@ -35,7 +35,7 @@ def rawdataplot(df: pd.DataFrame, **kwargs):
     interpolation : str, default "none"
         The interpolation method used.
 
-    vmax, vmin : float, default +/-max(abs(df))
+    vmax, vmin : float, default 99th and 1st percentile of df
         The range covered by the color map.
 
     resample : bool, default True
@@ -45,7 +45,13 @@ def rawdataplot(df: pd.DataFrame, **kwargs):
     skip_single_gaps : bool, default True
         If there is only missing one sample at a time, it will be interpolated.
         Uses .ffill(limit=2) instead .first().
+
+    downsample : bool, default False
+        Data larger than the axes is reduced to their pixel resolution before plotting,
+        which is faster for large data. Each pixel shows the value of largest magnitude
+        among the samples it covers, instead of the samples chosen by matplotlib.
     """
+    import matplotlib.pyplot as plt
 
     if not isinstance(df, pd.DataFrame):
         raise TypeError("Expected 'df' to be of type DataFrame")
@@ -63,33 +69,76 @@ def rawdataplot(df: pd.DataFrame, **kwargs):
     colorbar = kwargs.pop("colorbar", False)
     resample = kwargs.pop("resample", True)
     skip_single_gaps = kwargs.pop("skip_single_gaps", True)
+    downsample = kwargs.pop("downsample", False)
 
     if isinstance(df.index, pd.DatetimeIndex) and resample:
-        min_index_gap = min(df.index[1:] - df.index[:-1])
-        df = df.resample(min_index_gap, origin="start")
-        if skip_single_gaps:
-            df = df.ffill(limit=2)
-        else:
-            df = df.first()
+        index_gaps = np.diff(df.index.asi8)
+        min_index_gap = index_gaps.min()
+        # Uniformly sampled data is already on the resampled grid
+        if (index_gaps != min_index_gap).any():
+            # The gaps are in the unit of the index, which is not necessarily nanoseconds
+            df = df.resample(pd.Timedelta(min_index_gap, unit=df.index.unit), origin="start")
+            if skip_single_gaps:
+                df = df.ffill(limit=2)
+            else:
+                df = df.first()
     else:
         df = df.set_index(np.arange(len(df.index)))
 
     kwargs["cmap"] = kwargs.get("cmap", "seismic")
     kwargs["aspect"] = kwargs.get("aspect", "auto")
     kwargs["interpolation"] = kwargs.get("interpolation", "none")
-    kwargs["vmax"] = kwargs.get("vmax", np.nanquantile(df, 0.99))
-    kwargs["vmin"] = kwargs.get("vmin", np.nanquantile(df, 0.01))
+
+    values = df.to_numpy()
+
+    # Only compute the missing color limits, in a single pass over the data
+    limits = {k: q for k, q in (("vmin", 0.01), ("vmax", 0.99)) if k not in kwargs}
+    if limits:
+        kwargs.update(zip(limits, np.nanquantile(values, list(limits.values()))))
 
     if "ax" not in kwargs:
         plt.figure(figsize=figsize)
 
     ax = kwargs.pop("ax", plt.gca())
-    iax = ax.imshow(df.values.T, extent=[df.index[0], df.index[-1], df.columns[-1], df.columns[0]], **kwargs)
+
+    if downsample:
+        values = _downsample(values, (round(ax.bbox.width), round(ax.bbox.height)))
+
+    # Transpose once into a contiguous array, using single precision for display
+    values = np.ascontiguousarray(values.T, dtype=np.float32 if values.dtype == np.float64 else None)
+
+    iax = ax.imshow(values, extent=[df.index[0], df.index[-1], df.columns[-1], df.columns[0]], **kwargs)
 
     if colorbar:
         plt.colorbar(iax, ax=ax)
 
 
+def _reduce_blocks(ufunc: np.ufunc, values: np.ndarray, step: int) -> np.ndarray:
+    """Reduces consecutive blocks of rows, where the last block may be partial."""
+    n = len(values) // step * step
+    reduced = ufunc.reduce(values[:n].reshape(-1, step, *values.shape[1:]), axis=1)
+    if n < len(values):
+        reduced = np.concatenate([reduced, ufunc.reduce(values[n:], axis=0, keepdims=True)])
+    return reduced
+
+
+def _downsample(values: np.ndarray, shape: typing.Tuple[int, int]) -> np.ndarray:
+    """Reduces blocks of values to fit within the given shape.
+
+    Each block is reduced to its value of largest magnitude, ignoring NaN, such that
+    peaks remain visible.
+
+    """
+    for axis, size in enumerate(shape):
+        step = -(-values.shape[axis] // max(size, 1))
+        if step > 1:
+            values = np.moveaxis(values, axis, 0)
+            largest = _reduce_blocks(np.fmax, values, step)
+            smallest = _reduce_blocks(np.fmin, values, step)
+            values = np.moveaxis(np.where(largest >= -smallest, largest, smallest), 0, axis)
+    return values
+
+
 def scatterplot(df: pd.DataFrame, **kwargs):
     """Plots timeseries data or a two-column dataframe as a scatter plot.
 
@@ -118,6 +167,8 @@ def scatterplot(df: pd.DataFrame, **kwargs):
         Defaults to True if `c` is given.
 
     """
+    import matplotlib.pyplot as plt
+
     if isinstance(df, pd.Series):
         df = df.to_frame(name=df.name or "value").reset_index()
 
@@ -138,8 +189,8 @@ def scatterplot(df: pd.DataFrame, **kwargs):
     kwargs["colorbar"] = kwargs.get("colorbar", False)
     legend = kwargs.pop("legend", None)
 
-    # Convert column labels to strings to use 0 and 1 as arguments
-    ax: plt.Axes = df.rename(str, axis=1).plot.scatter(0, 1, **kwargs)
+    # Convert column labels to strings to use 0 and 1 as arguments, without copying data
+    ax: plt.Axes = df.rename(str, axis=1, copy=False).plot.scatter(0, 1, **kwargs)
 
     if legend is not False:
         if "c" in kwargs:
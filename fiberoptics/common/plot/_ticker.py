@@ -1,47 +1,84 @@
 import math
+import typing
 
 import matplotlib.ticker
+import numpy as np
 import pandas as pd
 
 
+_DATE_UNITS = ("Y", "M", "D", "h", "m", "s", "us")
+# Where each of the above components starts and ends in a formatted date
+_DATE_STARTS = (0, 5, 8, 11, 14, 17, 20)
+_DATE_ENDS = (4, 7, 10, 13, 16, 19, 26)
+
+
+def _get_date_components(dates: pd.DatetimeIndex) -> np.ndarray:
+    """Year, month, day, hour, minute, second and microsecond of each (local) date.
+
+    Each component is the offset from the date truncated to the next coarser unit,
+    computed with numpy datetime casts instead of per-attribute Timestamp lookups.
+
+    """
+    values = dates.tz_localize(None).to_numpy()
+    truncated = [values.astype(f"datetime64[{unit}]") for unit in _DATE_UNITS]
+    components = [truncated[0].view("i8")]
+    for coarse, fine in zip(truncated, truncated[1:]):
+        components.append((fine - coarse.astype(fine.dtype)).view("i8"))
+    return np.stack(components, axis=-1)
+
+
+def _format_dates(dates: pd.DatetimeIndex) -> typing.List[str]:
+    """Formats (local) dates as 'YYYY-MM-DD hh:mm:ss.ffffff'."""
+    values = dates.tz_localize(None).to_numpy()
+    return [s.replace("T", " ") for s in np.datetime_as_string(values, unit="us")]
+
+
 class IndexConverterMixin:
     def __init__(self, index: pd.Index):
-        self.d0, self.d1 = index[[0, 1]]
+        self.d0, self.d1 = index[0], index[1]
+        self.scale = self.d1 - self.d0
 
     def index2num(self, index: pd.Index):
-        return (index - self.d0) / (self.d1 - self.d0)
+        return (index - self.d0) / self.scale
 
     def num2index(self, num: float):
-        return self.d0 + (self.d1 - self.d0) * num
+        return self.d0 + self.scale * num
 
 
 class MyDateLocator(matplotlib.ticker.Locator, IndexConverterMixin):
+    _valid_freqs = pd.TimedeltaIndex(
+        [
+            *["1us", "2us", "5us"],
+            *["10us", "20us", "50us"],
+            *["100us", "200us", "500us"],
+            *["1000us", "2000us", "5000us"],
+            *["10000us", "20000us", "50000us"],
+            *["100000us", "200000us", "500000us"],
+            *["1s", "5s", "10s", "15s", "30s"],
+            *["1m", "5m", "10m", "15m", "30m"],
+            *["1h", "2h", "3h", "6h", "12h"],
+            *["1d", "3d", "7d", "14d"],
+        ]
+    )
+    _valid_freqs_ns = _valid_freqs.asi8
+
     def __init__(self, index: pd.DatetimeIndex):
         super().__init__(index)
-        self._valid_freqs = pd.TimedeltaIndex(
-            [
-                *["1us", "2us", "5us"],
-                *["10us", "20us", "50us"],
-                *["100us", "200us", "500us"],
-                *["1000us", "2000us", "5000us"],
-                *["10000us", "20000us", "50000us"],
-                *["100000us", "200000us", "500000us"],
-                *["1s", "5s", "10s", "15s", "30s"],
-                *["1m", "5m", "10m", "15m", "30m"],
-                *["1h", "2h", "3h", "6h", "12h"],
-                *["1d", "3d", "7d", "14d"],
-            ]
-        )
+        self._last_key = None
+        self._last_ticks = None
 
     def _get_valid_freq(self, target_freq: pd.Timedelta) -> pd.Timedelta:
-        try:
-            return next(filter(lambda x: target_freq < x, self._valid_freqs))
-        except StopIteration:
-            return self._valid_freqs[-1]
+        # The smallest valid frequency larger than the target, if any
+        i = np.searchsorted(self._valid_freqs_ns, target_freq.value, side="right")
+        return self._valid_freqs[min(i, len(self._valid_freqs) - 1)]
 
     def __call__(self):
         numticks = max(2, self.axis.get_tick_space() // 2)
         vmin, vmax = self.axis.get_view_interval()
+        # Redraws without panning or zooming give the same ticks
+        key = (vmin, vmax, numticks)
+        if key == self._last_key:
+            return self._last_ticks
         dmin, dmax = self.num2index(vmin), self.num2index(vmax)
         target_freq = (dmax - dmin) / numticks
         if target_freq > pd.Timedelta("365d") / 2:
@@ -53,45 +90,52 @@ class MyDateLocator(matplotlib.ticker.Locator, IndexConverterMixin):
         else:
             freq = self._get_valid_freq(target_freq)
             dates = pd.date_range(dmin.ceil(freq), dmax.floor(freq), freq=freq)
-        return self.index2num(dates)
+        self._last_key, self._last_ticks = key, self.index2num(dates)
+        return self._last_ticks
 
 
 class MyDateFormatter(matplotlib.ticker.Formatter, IndexConverterMixin):
     def __init__(self, index: pd.DatetimeIndex):
         super().__init__(index)
-
-    def _get_diff_component(self, ts1, ts2, reversed=False):
-        components = ("year", "month", "day", "hour", "minute", "second", "microsecond")
-        components = tuple(enumerate(components))
-
-        if reversed:
-            components = components[::-1]
-
-        for i, component in components:
-            if getattr(ts1, component) != getattr(ts2, component):
-                return i
-        return components[0][0]
+        self._last_values = None
+        self._last_dates = None
+
+    def _to_dates(self, values) -> pd.DatetimeIndex:
+        # Each draw converts the same tick locations for both the labels and the offset
+        values = np.array(values, dtype=np.float64)
+        if self._last_values is None or not np.array_equal(values, self._last_values):
+            self._last_dates = self.num2index(pd.Index(values)).round("us")
+            self._last_values = values
+        return self._last_dates
+
+    def _get_diff_component(self, components1, components2, reversed=False):
+        differs = np.flatnonzero(components1 != components2)
+        if not len(differs):
+            return len(_DATE_UNITS) - 1 if reversed else 0
+        return int(differs[-1] if reversed else differs[0])
 
     def get_offset(self):
         if not len(self.locs):
             return ""
-        dates: pd.DatetimeIndex = self.num2index(self.locs).round("us")
-        largest = self._get_diff_component(dates[0], dates[-1])
-        format = "%Y-%m-%d %H:%M:%S.%f"[: largest * 3]
-        return dates[0].strftime(format)
+        dates: pd.DatetimeIndex = self._to_dates(self.locs)
+        components = _get_date_components(dates[[0, -1]])
+        largest = self._get_diff_component(components[0], components[-1])
+        return _format_dates(dates[:1])[0][: _DATE_STARTS[largest]]
 
     def format_ticks(self, values):
-        dates: pd.DatetimeIndex = self.num2index(values).round("us")
+        dates: pd.DatetimeIndex = self._to_dates(values)
         if len(dates) < 2:
             return list(dates.tz_localize(None).astype(str))
-        largest = self._get_diff_component(dates[0], dates[-1])
-        smallest = self._get_diff_component(dates[0], dates[1], reversed=True)
-        format = "%Y-%m-%d %H:%M:%S.%f"[largest * 3 : smallest * 3 + 2]
-        formatted = dates.strftime(format)
-        if ".%f" in format:
-            while all(formatted.str[-1] == "0"):
-                formatted = formatted.str[:-1]
-        return formatted
+        components = _get_date_components(dates[[0, 1, -1]])
+        largest = self._get_diff_component(components[0], components[-1])
+        smallest = self._get_diff_component(components[0], components[1], reversed=True)
+        start, end = _DATE_STARTS[largest], _DATE_ENDS[smallest]
+        formatted = [s[start:end] for s in _format_dates(dates)]
+        if start < _DATE_STARTS[-1] and end == _DATE_ENDS[-1]:  # Fractional seconds shown
+            # Trim the trailing zeros shared by all labels in one pass
+            num_zeros = min(len(s) - len(s.rstrip("0")) for s in formatted)
+            formatted = [s[: len(s) - num_zeros] for s in formatted]
+        return pd.Index(formatted)
 
     def __call__(self, value, pos=None):
         return ""
@@ -99,12 +143,15 @@ class MyDateFormatter(matplotlib.ticker.Formatter, IndexConverterMixin):
 
 class MyLociLocator(matplotlib.ticker.AutoLocator):
     def __call__(self):
-        return list(filter(lambda x: x == int(x), super().__call__()))
+        ticks = np.asarray(super().__call__(), dtype=np.float64)
+        return ticks[ticks == np.floor(ticks)].tolist()
 
 
 class MyLociFormatter(matplotlib.ticker.Formatter, IndexConverterMixin):
     def __init__(self, index: pd.Index):
         super().__init__(index)
+        # Plain Python numbers, as each tick is formatted separately on every draw
+        self._d0, self._scale = np.array([self.d0, self.scale]).tolist()
 
     def __call__(self, x, pos=None):
-        return int(self.num2index(x))
+        return int(self._d0 + self._scale * x)
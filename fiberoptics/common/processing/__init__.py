@@ -1,10 +1,13 @@
 """Data processing functions including a variety of filters."""
 
-import math
-from datetime import datetime, timedelta
+import functools
 
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Upper bound on the number of window elements held in memory at once
+_MAX_WINDOW_ELEMENTS = 2**24
 
 
 def rolling_rms_window(df: pd.DataFrame, window: pd.Timedelta, min_periods=None) -> pd.DataFrame:
@@ -27,7 +30,10 @@ def rolling_rms_window(df: pd.DataFrame, window: pd.Timedelta, min_periods=None)
         The result of applying the RMS window.
 
     """
-    return df.pow(2).rolling(window, min_periods, center=True).mean().pow(0.5)
+    # The rolling window iterates over columns, which are made contiguous when squaring
+    squared = np.square(df.to_numpy().T, order="C").T
+    squared = pd.DataFrame(squared, index=df.index, columns=df.columns, copy=False)
+    return np.sqrt(squared.rolling(window, min_periods, center=True).mean())
 
 
 def low_cut_filter(df: pd.DataFrame, numtaps: int, cutoff: int, fs: int = 10000) -> pd.DataFrame:
@@ -51,10 +57,28 @@ def low_cut_filter(df: pd.DataFrame, numtaps: int, cutoff: int, fs: int = 10000)
         The filtered data.
 
     """
+    import scipy.ndimage
     import scipy.signal
 
-    window = scipy.signal.firwin(numtaps | 1, cutoff, pass_zero=False, fs=fs)
-    return df.apply(lambda x: scipy.signal.convolve(x, window, mode="same"))
+    # Cutoffs are hashed as a tuple, as `firwin` also accepts several of them
+    window = _get_low_cut_window(numtaps | 1, tuple(np.atleast_1d(cutoff).tolist()), fs)
+    # All loci are filtered at once along rows of the transposed data, as pandas lays it out
+    values = df.to_numpy(dtype=np.float64).T
+    if len(window) < 32:
+        filtered = scipy.ndimage.convolve1d(values, window, axis=1, mode="constant")
+    else:
+        filtered = scipy.signal.oaconvolve(values, window[np.newaxis], mode="same", axes=1)
+    return pd.DataFrame(filtered.T, index=df.index, columns=df.columns, copy=False)
+
+
+@functools.lru_cache
+def _get_low_cut_window(numtaps: int, cutoff: tuple, fs: int) -> np.ndarray:
+    """The FIR window of a low-cut filter, shared between calls with the same parameters."""
+    import scipy.signal
+
+    window = scipy.signal.firwin(numtaps, cutoff, pass_zero=False, fs=fs)
+    window.setflags(write=False)
+    return window
 
 
 def moveout_correction(df: pd.DataFrame, channel: int, moveout: float) -> pd.DataFrame:
@@ -84,7 +108,22 @@ def moveout_correction(df: pd.DataFrame, channel: int, moveout: float) -> pd.Dat
         The moveout-corrected data.
 
     """
-    return df.apply(lambda col: col.shift(int(abs(col.name - channel) * moveout)))
+    # Columns are shifted as rows of the transposed data, which is also the layout pandas uses
+    values = df.to_numpy().T
+    shifts = (np.abs(df.columns.to_numpy() - channel) * moveout).astype(np.int64)
+    corrected = np.full(values.shape, np.nan, dtype=values.dtype if values.dtype.kind in "fc" else np.float64)
+    num_rows = values.shape[1]
+    # Neighbouring loci often share a shift, and are moved together as one block
+    starts = np.flatnonzero(np.diff(shifts, prepend=shifts[:1] - 1))
+    ends = np.append(starts[1:], len(shifts))
+    for start, end, shift in zip(starts.tolist(), ends.tolist(), shifts[starts].tolist()):
+        if abs(shift) >= num_rows:
+            continue
+        if shift >= 0:
+            corrected[start:end, shift:] = values[start:end, : num_rows - shift]
+        else:
+            corrected[start:end, :shift] = values[start:end, -shift:]
+    return pd.DataFrame(corrected.T, index=df.index, columns=df.columns, copy=False)
 
 
 def median_depth_filter(df: pd.DataFrame, length: int) -> pd.DataFrame:
@@ -104,7 +143,48 @@ def median_depth_filter(df: pd.DataFrame, length: int) -> pd.DataFrame:
         The median depth filtered dataframe
 
     """
-    return df.rolling(length, center=True, min_periods=1, axis=1).median()
+    values = df.to_numpy(dtype=np.float64)
+    if length == 3:
+        return pd.DataFrame(_rolling_median3(values), index=df.index, columns=df.columns, copy=False)
+    filtered = np.empty(values.shape)
+    # Rows are filtered in chunks to bound the memory used by the sorted windows
+    chunk_size = max(1, _MAX_WINDOW_ELEMENTS // max(1, values.shape[1] * length))
+    for i in range(0, len(values), chunk_size):
+        filtered[i : i + chunk_size] = _rolling_median(values[i : i + chunk_size], length)
+    return pd.DataFrame(filtered, index=df.index, columns=df.columns, copy=False)
+
+
+def _rolling_median(values: np.ndarray, length: int) -> np.ndarray:
+    """Centered rolling median along the last axis, ignoring NaN.
+
+    Equivalent to `rolling(length, center=True, min_periods=1).median()` along rows.
+
+    """
+    left = length // 2
+    padded = np.pad(values, ((0, 0), (left, length - 1 - left)), constant_values=np.nan)
+    windows = np.sort(sliding_window_view(padded, length, axis=1), axis=-1)  # NaN is sorted last
+    counts = np.count_nonzero(~np.isnan(windows), axis=-1, keepdims=True)
+    lower = np.take_along_axis(windows, np.maximum(counts - 1, 0) // 2, axis=-1)
+    upper = np.take_along_axis(windows, np.minimum(counts // 2, length - 1), axis=-1)
+    return ((lower + upper) / 2)[..., 0]
+
+
+def _rolling_median3(values: np.ndarray) -> np.ndarray:
+    """Centered rolling median of length 3 along the last axis, ignoring NaN.
+
+    Same as `_rolling_median(values, 3)`, but computed from the neighbouring values
+    without sorting any windows.
+
+    """
+    padded = np.pad(values, ((0, 0), (1, 1)), constant_values=np.nan)
+    a, b, c = padded[:, :-2], padded[:, 1:-1], padded[:, 2:]
+    filtered = np.maximum(np.minimum(a, b), np.minimum(np.maximum(a, b), c))
+    # Windows with missing values propagate NaN, and the median of the rest is their mean
+    rows, cols = np.nonzero(np.isnan(filtered))
+    windows = np.stack([a[rows, cols], b[rows, cols], c[rows, cols]])
+    with np.errstate(invalid="ignore"):
+        filtered[rows, cols] = np.nansum(windows, axis=0) / np.count_nonzero(~np.isnan(windows), axis=0)
+    return filtered
 
 
 def depth_aggregation(df: pd.DataFrame, aggregation_window: int = 0, aggregation_function: str = "median") -> pd.DataFrame:
@@ -139,27 +219,79 @@ def depth_aggregation(df: pd.DataFrame, aggregation_window: int = 0, aggregation
     if aggregation_window == 0:
         return df
 
-    # if df.columns.nlevels == 1:
-    #     groups = df.groupby(
-    #         (df.columns / aggregation_window).astype("int") * aggregation_window, axis=1
-    #     )
-    #     df: pd.DataFrame = getattr(groups, aggregation_function)()
-    #     return df
+    # Group by top-level index and depth bin at once, keeping top-level groups separate
+    loci = df.columns.get_level_values(-1)
+    bins = (loci / aggregation_window).astype("int") * aggregation_window
+    keys = [df.columns.get_level_values(0), bins] if df.columns.nlevels > 1 else bins
+    aggregated = _reduce_adjacent_columns(df, keys, aggregation_function)
+    if aggregated is not None:
+        return aggregated
+    # Rows are aggregated in chunks to bound the memory of the intermediate copies made by groupby
+    chunk_size = max(1, _MAX_WINDOW_ELEMENTS // max(1, df.shape[1]))
+    chunks = [
+        getattr(df.iloc[i : i + chunk_size].groupby(keys, axis=1), aggregation_function)()
+        for i in range(0, max(len(df), 1), chunk_size)
+    ]
+    return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+
+def _reduce_adjacent_columns(df: pd.DataFrame, keys, aggregation_function: str):
+    """Aggregates runs of adjacent columns with equal keys using `ufunc.reduceat`.
+
+    Medians are computed by `_median_of_runs` instead. Returns None if this does not
+    reproduce the groupby, i.e. for other aggregation functions, non-float or missing
+    values, or keys that are not sorted.
+
+    """
+    dtypes = set(df.dtypes)
+    if aggregation_function not in _REDUCEAT_UFUNCS or df.empty or len(dtypes) != 1:
+        return None
+    dtype = dtypes.pop()
+    if not isinstance(dtype, np.dtype) or dtype.kind != "f":
+        return None
+
+    labels = pd.MultiIndex.from_arrays(keys) if isinstance(keys, list) else pd.Index(keys)
+    if not labels.is_monotonic_increasing:
+        return None
+    values = df.to_numpy()
+    if np.isnan(values).any():
+        return None
 
-    # Split the groups into a list of DataFrames
-    grouped = df.groupby(level=0, axis=1)
-    grouped_dfs = [grouped.get_group(group_name) for group_name in grouped.groups] if df.columns.nlevels > 1 else [df]
+    starts = np.flatnonzero(~labels.duplicated())
+    if aggregation_function == "median":
+        aggregated = _median_of_runs(values, starts)
+    else:
+        aggregated = _REDUCEAT_UFUNCS[aggregation_function].reduceat(values, starts, axis=1)
+    if aggregation_function == "mean":
+        aggregated /= np.diff(starts, append=len(labels))
+    return pd.DataFrame(aggregated, index=df.index, columns=labels[starts], copy=False)
 
-    aggregated_dfs = []
-    for grouped_df in grouped_dfs:
-        columns = grouped_df.columns.levels[1] if grouped_df.columns.nlevels > 1 else grouped_df.columns
-        groups = grouped_df.groupby((columns / aggregation_window).astype("int") * aggregation_window, axis=1)
-        grouped_df: pd.DataFrame = getattr(groups, aggregation_function)()
-        aggregated_dfs.append(grouped_df)
 
-    merged_df = pd.concat(aggregated_dfs, axis=1, keys=df.columns.levels[0]) if len(aggregated_dfs) > 1 else aggregated_dfs[0]
+# Aggregations that can be computed on adjacent columns by `_reduce_adjacent_columns`
+_REDUCEAT_UFUNCS = {"sum": np.add, "mean": np.add, "min": np.minimum, "max": np.maximum, "median": None}
 
-    return merged_df
+
+def _median_of_runs(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Computes the median of each run of adjacent columns starting at the given indices.
+
+    Runs of equal length are gathered into a `(rows, runs, length)` array and sorted
+    along the last axis together, in row chunks to bound memory.
+
+    """
+    lengths = np.diff(starts, append=values.shape[1])
+    aggregated = np.empty((len(values), len(starts)), dtype=values.dtype)
+    for length in np.unique(lengths).tolist():
+        runs = np.flatnonzero(lengths == length)
+        columns = (starts[runs, None] + np.arange(length)).ravel()
+        chunk_size = max(1, _MAX_WINDOW_ELEMENTS // len(columns))
+        for i in range(0, len(values), chunk_size):
+            block = np.take(values[i : i + chunk_size], columns, axis=1).reshape(-1, len(runs), length)
+            block.sort(axis=-1)
+            if length % 2:
+                aggregated[i : i + chunk_size, runs] = block[..., length // 2]
+            else:
+                aggregated[i : i + chunk_size, runs] = (block[..., length // 2 - 1] + block[..., length // 2]) / 2
+    return aggregated
 
 
 def split_around_gaps(df: pd.DataFrame, min_gap_length: str) -> list:
@@ -181,18 +313,14 @@ def split_around_gaps(df: pd.DataFrame, min_gap_length: str) -> list:
         List of dataframes
 
     """
-    dataframes_list = []
-    start_idx, prev_idx = df.index[0], df.index[0]
-    for index in df.index:
-        if (index.left - prev_idx.left) > pd.Timedelta(min_gap_length):
-            dataframes_list.append(df.loc[pd.Timestamp(start_idx.left) : pd.Timestamp(prev_idx.left)])
-            start_idx = index
-        prev_idx = index
-
-    # Add the last DataFrame (after the last gap) to the list
-    dataframes_list.append(df.loc[pd.Timestamp(start_idx.left) :])
+    # Integer time stamps, since tz-aware end points would otherwise be compared as objects
+    left = df.index.left
+    gaps = np.diff(left.asi8) > pd.Timedelta(min_gap_length).as_unit(left.unit).value
+    split_points = np.flatnonzero(gaps) + 1
+    starts = [0, *split_points.tolist()]
+    ends = [*split_points.tolist(), len(df)]
 
-    return dataframes_list
+    return [df.iloc[start:end] for start, end in zip(starts, ends)]
 
 
 def resample_raw_data(df: pd.DataFrame, dec: int) -> pd.DataFrame:
@@ -213,6 +341,23 @@ def resample_raw_data(df: pd.DataFrame, dec: int) -> pd.DataFrame:
     """
     from scipy import signal
 
-    downsampled = signal.resample_poly(df, up=1, down=dec, axis=0, window=10)
+    # Resample along rows of the transposed data, which is how pandas lays it out
+    values = df.to_numpy().T
+    # The filter is only designed when decimating, matching `resample_poly` with `window=10`
+    window = _get_resample_window(dec) if dec > 1 else 10
+    # Integer data keeps the float64 filter, since casting would truncate it to zeros
+    if dec > 1 and values.dtype.kind in "fc":
+        window = window.astype(values.dtype)
+    downsampled = signal.resample_poly(values, up=1, down=dec, axis=1, window=window)
+
+    return pd.DataFrame(downsampled.T, index=df.index[::dec], columns=df.columns, copy=False)
+
+
+@functools.lru_cache
+def _get_resample_window(dec: int) -> np.ndarray:
+    """The low-pass filter `resample_poly` designs for decimation, shared between calls."""
+    from scipy import signal
 
-    return pd.DataFrame(downsampled, index=df.index[::dec], columns=df.columns)
+    window = signal.firwin(20 * dec + 1, 1 / dec, window=10)
+    window.setflags(write=False)
+    return window
@@ -1,11 +1,19 @@
 """Wrappers around sklearn classes to handle dataframes."""
 
+import inspect
 from typing import Union
 
+import numpy as np
 import pandas as pd
 import sklearn.decomposition
 import sklearn.manifold
 import sklearn.preprocessing
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Fixed windows up to this length have their quantiles selected directly instead of by pandas
+_MAX_SELECTION_WINDOW = 32
+# Upper bound on the number of window elements held in memory at once
+_MAX_WINDOW_ELEMENTS = 2**24
 
 
 def _generic_dataclass(cls):
@@ -27,18 +35,26 @@ def _generic_dataclass(cls):
     return cls
 
 
+def _apply_to_series(method, series: pd.Series) -> pd.Series:
+    """Applies a sklearn method to a series as a single feature, without building a frame."""
+    if series.empty:
+        return series.copy()
+    result = method(series.to_numpy().reshape(-1, 1))
+    return pd.Series(result[:, 0], index=series.index, name=series.name, copy=False)
+
+
 class PCA(sklearn.decomposition.PCA):
     """Overrides methods to handle dataframes."""
 
     def fit_transform(self, X: pd.DataFrame, y=None):
-        return pd.DataFrame(super().fit_transform(X), index=X.index)
+        return pd.DataFrame(super().fit_transform(X), index=X.index, copy=False)
 
 
 class TSNE(sklearn.manifold.TSNE):
     """Overrides methods to handle dataframes."""
 
     def fit_transform(self, X: pd.DataFrame, y=None):
-        return pd.DataFrame(super().fit_transform(X), index=X.index)
+        return pd.DataFrame(super().fit_transform(X), index=X.index, copy=False)
 
 
 class MinMaxScaler(sklearn.preprocessing.MinMaxScaler):
@@ -49,15 +65,16 @@ class MinMaxScaler(sklearn.preprocessing.MinMaxScaler):
         return self
 
     def transform(self, df: pd.DataFrame):
-        result = df if df.empty else super().transform(df)
-        return pd.DataFrame(result, index=df.index, columns=df.columns)
+        if df.empty:
+            return df.copy(deep=False)
+        return pd.DataFrame(super().transform(df), index=df.index, columns=df.columns, copy=False)
 
     def fit_transform(self, df: pd.DataFrame):
         return self.fit(df).transform(df)
 
     def inverse_transform(self, df: pd.DataFrame):
         result = super().inverse_transform(df)
-        return pd.DataFrame(result, index=df.index, columns=df.columns)
+        return pd.DataFrame(result, index=df.index, columns=df.columns, copy=False)
 
 
 class MinMax1dScaler(MinMaxScaler):
@@ -65,20 +82,17 @@ class MinMax1dScaler(MinMaxScaler):
 
     def fit(self, df_or_series: Union[pd.DataFrame, pd.Series]):
         if isinstance(df_or_series, pd.Series):
-            df = df_or_series.rename(None).to_frame()
-            return super().fit(df)
+            return super().fit(df_or_series.to_numpy().reshape(-1, 1))
         return super().fit(df_or_series)
 
     def transform(self, df_or_series: Union[pd.DataFrame, pd.Series]):
         if isinstance(df_or_series, pd.Series):
-            df = df_or_series.rename(None).to_frame()
-            return super().transform(df)[0].rename(df_or_series.name)
+            return _apply_to_series(super(MinMaxScaler, self).transform, df_or_series)
         return super().transform(df_or_series)
 
     def inverse_transform(self, df_or_series: Union[pd.DataFrame, pd.Series]):
         if isinstance(df_or_series, pd.Series):
-            df = df_or_series.rename(None).to_frame()
-            return super().inverse_transform(df)[0].rename(df_or_series.name)
+            return _apply_to_series(super(MinMaxScaler, self).inverse_transform, df_or_series)
         return super().inverse_transform(df_or_series)
 
 
@@ -86,13 +100,21 @@ class MinMax2dScaler(MinMax1dScaler):
     """Overrides methods to apply to 2d data."""
 
     def fit(self, df: pd.DataFrame):
-        return super().fit(df.stack(dropna=False))
+        return super().fit(pd.Series(df.to_numpy().ravel()))
 
     def transform(self, df: pd.DataFrame):
-        return super().transform(df.stack(dropna=False)).unstack()
+        result = super().transform(pd.Series(df.to_numpy().ravel()))
+        return pd.DataFrame(result.to_numpy().reshape(df.shape), index=df.index, columns=df.columns, copy=False)
+
+    def fit_transform(self, df: pd.DataFrame):
+        series = pd.Series(df.to_numpy().ravel())
+        super().fit(series)
+        result = super().transform(series)
+        return pd.DataFrame(result.to_numpy().reshape(df.shape), index=df.index, columns=df.columns, copy=False)
 
     def inverse_transform(self, df: pd.DataFrame):
-        return super().inverse_transform(df.stack(dropna=False)).unstack()
+        result = super().inverse_transform(pd.Series(df.to_numpy().ravel()))
+        return pd.DataFrame(result.to_numpy().reshape(df.shape), index=df.index, columns=df.columns, copy=False)
 
 
 class RobustScaler(sklearn.preprocessing.RobustScaler):
@@ -103,15 +125,16 @@ class RobustScaler(sklearn.preprocessing.RobustScaler):
         return self
 
     def transform(self, df: pd.DataFrame):
-        result = df if df.empty else super().transform(df)
-        return pd.DataFrame(result, index=df.index, columns=df.columns)
+        if df.empty:
+            return df.copy(deep=False)
+        return pd.DataFrame(super().transform(df), index=df.index, columns=df.columns, copy=False)
 
     def fit_transform(self, df: pd.DataFrame):
         return self.fit(df).transform(df)
 
     def inverse_transform(self, df: pd.DataFrame):
         result = super().inverse_transform(df)
-        return pd.DataFrame(result, index=df.index, columns=df.columns)
+        return pd.DataFrame(result, index=df.index, columns=df.columns, copy=False)
 
 
 class Robust1dScaler(RobustScaler):
@@ -119,20 +142,17 @@ class Robust1dScaler(RobustScaler):
 
     def fit(self, df_or_series: Union[pd.DataFrame, pd.Series]):
         if isinstance(df_or_series, pd.Series):
-            df = df_or_series.rename(None).to_frame()
-            return super().fit(df)
+            return super().fit(df_or_series.to_numpy().reshape(-1, 1))
         return super().fit(df_or_series)
 
     def transform(self, df_or_series: Union[pd.DataFrame, pd.Series]):
         if isinstance(df_or_series, pd.Series):
-            df = df_or_series.rename(None).to_frame()
-            return super().transform(df)[0].rename(df_or_series.name)
+            return _apply_to_series(super(RobustScaler, self).transform, df_or_series)
         return super().transform(df_or_series)
 
     def inverse_transform(self, df_or_series: Union[pd.DataFrame, pd.Series]):
         if isinstance(df_or_series, pd.Series):
-            df = df_or_series.rename(None).to_frame()
-            return super().inverse_transform(df)[0].rename(df_or_series.name)
+            return _apply_to_series(super(RobustScaler, self).inverse_transform, df_or_series)
         return super().inverse_transform(df_or_series)
 
 
@@ -140,13 +160,21 @@ class Robust2dScaler(Robust1dScaler):
     """Overrides methods to apply to 2d data."""
 
     def fit(self, df: pd.DataFrame):
-        return super().fit(df.stack(dropna=False))
+        return super().fit(pd.Series(df.to_numpy().ravel()))
 
     def transform(self, df: pd.DataFrame):
-        return super().transform(df.stack(dropna=False)).unstack()
+        result = super().transform(pd.Series(df.to_numpy().ravel()))
+        return pd.DataFrame(result.to_numpy().reshape(df.shape), index=df.index, columns=df.columns, copy=False)
+
+    def fit_transform(self, df: pd.DataFrame):
+        series = pd.Series(df.to_numpy().ravel())
+        super().fit(series)
+        result = super().transform(series)
+        return pd.DataFrame(result.to_numpy().reshape(df.shape), index=df.index, columns=df.columns, copy=False)
 
     def inverse_transform(self, df: pd.DataFrame):
-        return super().inverse_transform(df.stack(dropna=False)).unstack()
+        result = super().inverse_transform(pd.Series(df.to_numpy().ravel()))
+        return pd.DataFrame(result.to_numpy().reshape(df.shape), index=df.index, columns=df.columns, copy=False)
 
 
 class StandardScaler(sklearn.preprocessing.StandardScaler):
@@ -157,15 +185,16 @@ class StandardScaler(sklearn.preprocessing.StandardScaler):
         return self
 
     def transform(self, df: pd.DataFrame):
-        result = df if df.empty else super().transform(df)
-        return pd.DataFrame(result, index=df.index, columns=df.columns)
+        if df.empty:
+            return df.copy(deep=False)
+        return pd.DataFrame(super().transform(df), index=df.index, columns=df.columns, copy=False)
 
     def fit_transform(self, df: pd.DataFrame):
         return self.fit(df).transform(df)
 
     def inverse_transform(self, df: pd.DataFrame):
         result = super().inverse_transform(df)
-        return pd.DataFrame(result, index=df.index, columns=df.columns)
+        return pd.DataFrame(result, index=df.index, columns=df.columns, copy=False)
 
 
 class Standard1dScaler(StandardScaler):
@@ -173,20 +202,17 @@ class Standard1dScaler(StandardScaler):
 
     def fit(self, df_or_series: Union[pd.DataFrame, pd.Series]):
         if isinstance(df_or_series, pd.Series):
-            df = df_or_series.rename(None).to_frame()
-            return super().fit(df)
+            return super().fit(df_or_series.to_numpy().reshape(-1, 1))
         return super().fit(df_or_series)
 
     def transform(self, df_or_series: Union[pd.DataFrame, pd.Series]):
         if isinstance(df_or_series, pd.Series):
-            df = df_or_series.rename(None).to_frame()
-            return super().transform(df)[0].rename(df_or_series.name)
+            return _apply_to_series(super(StandardScaler, self).transform, df_or_series)
         return super().transform(df_or_series)
 
     def inverse_transform(self, df_or_series: Union[pd.DataFrame, pd.Series]):
         if isinstance(df_or_series, pd.Series):
-            df = df_or_series.rename(None).to_frame()
-            return super().inverse_transform(df)[0].rename(df_or_series.name)
+            return _apply_to_series(super(StandardScaler, self).inverse_transform, df_or_series)
         return super().inverse_transform(df_or_series)
 
 
@@ -194,13 +220,84 @@ class Standard2dScaler(Standard1dScaler):
     """Overrides methods to apply to 2d data."""
 
     def fit(self, df: pd.DataFrame):
-        return super().fit(df.stack(dropna=False))
+        return super().fit(pd.Series(df.to_numpy().ravel()))
 
     def transform(self, df: pd.DataFrame):
-        return super().transform(df.stack(dropna=False)).unstack()
+        result = super().transform(pd.Series(df.to_numpy().ravel()))
+        return pd.DataFrame(result.to_numpy().reshape(df.shape), index=df.index, columns=df.columns, copy=False)
+
+    def fit_transform(self, df: pd.DataFrame):
+        series = pd.Series(df.to_numpy().ravel())
+        super().fit(series)
+        result = super().transform(series)
+        return pd.DataFrame(result.to_numpy().reshape(df.shape), index=df.index, columns=df.columns, copy=False)
 
     def inverse_transform(self, df: pd.DataFrame):
-        return super().inverse_transform(df.stack(dropna=False)).unstack()
+        result = super().inverse_transform(pd.Series(df.to_numpy().ravel()))
+        return pd.DataFrame(result.to_numpy().reshape(df.shape), index=df.index, columns=df.columns, copy=False)
+
+
+def _rolling(df: pd.DataFrame, *args, **kwargs):
+    """Rolling window over the data laid out with contiguous columns.
+
+    Pandas aggregates rolling windows one column at a time, so the columns are made
+    contiguous once instead of being copied for every aggregation.
+
+    """
+    values = np.ascontiguousarray(df.to_numpy().T).T
+    return pd.DataFrame(values, index=df.index, columns=df.columns, copy=False).rolling(*args, **kwargs)
+
+
+def _float_dtype(df: pd.DataFrame) -> np.dtype:
+    """The dtype of scaled data, keeping floating point input as is like sklearn does."""
+    dtype = np.result_type(*df.dtypes) if len(df.columns) else np.dtype(np.float64)
+    return dtype if dtype.kind == "f" else np.dtype(np.float64)
+
+
+def _get_fixed_window(df: pd.DataFrame, *args, **kwargs):
+    """The length and centering of rolling arguments that only specify a fixed window, otherwise None."""
+    try:
+        arguments = inspect.signature(pd.DataFrame.rolling).bind(df, *args, **kwargs).arguments
+    except TypeError:
+        return None
+    window, center = arguments["window"], arguments.get("center", False)
+    if set(arguments) - {"self", "window", "center"} or not isinstance(center, bool):
+        return None
+    if not isinstance(window, int) or isinstance(window, bool) or window < 1:
+        return None
+    return window, center
+
+
+def _rolling_quantiles(values: np.ndarray, window: int, center: bool, quantiles: tuple) -> list:
+    """Rolling quantiles over fixed windows along the first axis.
+
+    Equivalent to `rolling(window, center=center).quantile(q)` for each quantile, but
+    selects the order statistics of every window at once instead of maintaining a sorted
+    skiplist, which is faster for short windows.
+
+    """
+    columns = np.ascontiguousarray(values.T, dtype=np.float64)
+    num_windows = columns.shape[1] - window + 1
+    # Output rows are aligned to the end of the windows, or their middle when centered
+    first = window - 1 - ((window - 1) // 2 if center else 0)
+    positions = [q * (window - 1) for q in quantiles]
+    kth = sorted({int(p) for p in positions} | {int(p) + 1 for p in positions if p != int(p)})
+    results = [np.full(columns.shape, np.nan) for _ in quantiles]
+    # Windows are selected in chunks to bound the memory used by the partitioned copies
+    chunk_size = max(1, _MAX_WINDOW_ELEMENTS // max(1, len(columns) * window))
+    for i in range(0, max(num_windows, 0), chunk_size):
+        windows = sliding_window_view(columns[:, i : i + chunk_size + window - 1], window, axis=1)
+        selected = np.partition(windows, kth, axis=-1)
+        missing = ~np.isfinite(windows).all(axis=-1)  # Pandas treats infinite values as missing
+        for result, position in zip(results, positions):
+            low = int(position)
+            value = selected[..., low]
+            if position != low:  # Linear interpolation, as done by pandas
+                # Windows with infinite values are masked below, so their invalid results are ignored
+                with np.errstate(invalid="ignore"):
+                    value = value + (selected[..., low + 1] - value) * (position - low)
+            result[:, first + i : first + i + windows.shape[1]] = np.where(missing, np.nan, value)
+    return [result.T for result in results]
 
 
 @_generic_dataclass
@@ -212,13 +309,18 @@ class TimeseriesStandardScaler:
     """
 
     def _transform(self, df: pd.DataFrame):
-        mean = df.rolling(*self.args, **self.kwargs).mean()
-        std = df.rolling(*self.args, **self.kwargs).std().bfill()
-        return df.sub(mean, axis=0).div(std, axis=0)
+        rolling = _rolling(df, *self.args, **self.kwargs)
+        mean = rolling.mean()
+        std = rolling.std()
+        std.bfill(inplace=True)  # In place, to avoid copying the rolling result
+        # Scaled in place on the aligned arrays, instead of allocating a frame per operation
+        scaled = np.subtract(df.to_numpy(), mean.to_numpy(), dtype=_float_dtype(df))
+        scaled /= std.to_numpy()
+        return pd.DataFrame(scaled, index=df.index, columns=df.columns, copy=False)
 
     def fit_transform(self, df: pd.DataFrame):
         if isinstance(df.index, pd.IntervalIndex):
-            return self._transform(df.set_index(df.index.mid)).set_index(df.index)
+            return self._transform(df.set_axis(df.index.mid, copy=False)).set_axis(df.index, copy=False)
         return self._transform(df)
 
 
@@ -231,12 +333,17 @@ class TimeseriesRobustScaler:
     """
 
     def _transform(self, df: pd.DataFrame):
-        q25 = df.rolling(*self.args, **self.kwargs).quantile(0.25)
-        q50 = df.rolling(*self.args, **self.kwargs).quantile(0.50)
-        q75 = df.rolling(*self.args, **self.kwargs).quantile(0.75)
-        return df.sub(q50, axis=0).div(q75 - q25, axis=0)
+        window = _get_fixed_window(df, *self.args, **self.kwargs)
+        if window is not None and window[0] <= _MAX_SELECTION_WINDOW:
+            q25, q50, q75 = _rolling_quantiles(df.to_numpy(), *window, (0.25, 0.50, 0.75))
+        else:
+            rolling = _rolling(df, *self.args, **self.kwargs)
+            q25, q50, q75 = (rolling.quantile(q).to_numpy() for q in (0.25, 0.50, 0.75))
+        scaled = np.subtract(df.to_numpy(), q50, dtype=_float_dtype(df))
+        scaled /= np.subtract(q75, q25)
+        return pd.DataFrame(scaled, index=df.index, columns=df.columns, copy=False)
 
     def fit_transform(self, df: pd.DataFrame):
         if isinstance(df.index, pd.IntervalIndex):
-            return self._transform(df.set_index(df.index.mid)).set_index(df.index)
+            return self._transform(df.set_axis(df.index.mid, copy=False)).set_axis(df.index, copy=False)
         return self._transform(df)
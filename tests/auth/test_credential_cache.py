@@ -0,0 +1,37 @@
+import os
+
+from azure.identity import AuthenticationRecord
+
+from fiberoptics.common.auth import CredentialCache
+
+
+def _make_record(username: str):
+    return AuthenticationRecord("tenant", "client", "login.microsoftonline.com", "account", username)
+
+
+def test_write_authentication_record__same_mtime__should_read_latest(tmp_path):
+    cache = CredentialCache("test")
+    cache.authentication_record_filepath = tmp_path / "record"
+
+    cache.write_authentication_record(_make_record("first"))
+    mtime_ns = os.stat(cache.authentication_record_filepath).st_mtime_ns
+    cache.read_authentication_record()
+    cache.write_authentication_record(_make_record("second"))
+    # Two writes within the timestamp granularity of the filesystem
+    os.utime(cache.authentication_record_filepath, ns=(mtime_ns, mtime_ns))
+
+    assert cache.read_authentication_record().username == "second"
+
+
+def test_read_authentication_record__rewritten_with_same_mtime__should_read_latest(tmp_path):
+    cache = CredentialCache("test")
+    cache.authentication_record_filepath = tmp_path / "record"
+
+    cache.write_authentication_record(_make_record("first"))
+    mtime_ns = os.stat(cache.authentication_record_filepath).st_mtime_ns
+    cache.read_authentication_record()
+    # Rewritten by another process, within the timestamp granularity of the filesystem
+    cache.authentication_record_filepath.write_text(_make_record("rewritten").serialize())
+    os.utime(cache.authentication_record_filepath, ns=(mtime_ns, mtime_ns))
+
+    assert cache.read_authentication_record().username == "rewritten"
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from fiberoptics.common.io import get_filepaths
+
+
+def _walk_filepaths(folder):
+    return [os.path.join(dp, f) for dp, ds, fs in os.walk(folder) for f in fs]
+
+
+def test_get_filepaths__matches_os_walk(tmp_path):
+    for name in ["a", "sub/b", "sub/nested/c", "other/d"]:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    os.symlink(tmp_path / "missing", tmp_path / "broken")
+    os.symlink(tmp_path / "sub", tmp_path / "linked_sub")
+    if hasattr(os, "mkfifo"):
+        os.mkfifo(tmp_path / "fifo")
+
+    result = get_filepaths(str(tmp_path))
+
+    assert result == _walk_filepaths(str(tmp_path))
+    assert str(tmp_path / "broken") in result
+
+
+@pytest.mark.parametrize("folder", ["missing", "file"])
+def test_get_filepaths__not_a_folder__should_return_empty(tmp_path, folder):
+    (tmp_path / "file").touch()
+
+    assert get_filepaths(str(tmp_path / folder)) == []
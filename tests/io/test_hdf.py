@@ -0,0 +1,29 @@
+import h5py
+import numpy as np
+import pandas as pd
+import pytest
+
+from fiberoptics.common.io import read_hdf, write_hdf
+
+
+@pytest.mark.parametrize(
+    "kwargs,compression",
+    [
+        pytest.param(dict(), None, id="default"),
+        pytest.param(dict(compression="gzip"), "gzip", id="gzip"),
+        pytest.param(dict(compression="lzf"), "lzf", id="lzf"),
+    ],
+)
+def test_write_hdf__roundtrip(tmp_path, kwargs, compression):
+    filepath = str(tmp_path / "data" / "file.h5")
+    index = pd.date_range("2023-08-21", periods=100, freq="1s", tz="UTC")
+    df = pd.DataFrame(np.random.default_rng(0).random((100, 20)), index, np.arange(20) * 1.02)
+
+    write_hdf(filepath, df, dict(name="test"), **kwargs)
+    result, metadata = read_hdf(filepath)
+
+    pd.testing.assert_frame_equal(result, df)
+    assert metadata == dict(name="test")
+    with h5py.File(filepath, mode="r") as file:
+        assert file["values"].compression == compression
+        assert (file["values"].chunks is None) == (compression is None)
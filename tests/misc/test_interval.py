@@ -1,8 +1,15 @@
+import concurrent.futures
+import os
+import threading
+import time
+
+import numpy as np
 import pandas as pd
 import pytest
 from pytest_mock import MockerFixture
 
 from fiberoptics.common.misc._interval import (
+    _get_max_cached_rows,
     add_interval,
     combine_continuous_intervals,
     deserialize_interval_index,
@@ -62,6 +69,14 @@ from fiberoptics.common.misc._interval import (
             [pd.IntervalIndex.from_tuples([(1, 2), (2, 3), (5, 6)])],
             id="nonzero_threshold",
         ),
+        pytest.param(
+            (pd.IntervalIndex.from_tuples([(0, 10), (1, 2), (3, 4), (12, 13)]),),
+            [
+                pd.IntervalIndex.from_tuples([(0, 10), (1, 2), (3, 4)]),
+                pd.IntervalIndex.from_tuples([(12, 13)]),
+            ],
+            id="nested_intervals",
+        ),
         pytest.param(
             (
                 pd.IntervalIndex.from_arrays(
@@ -146,6 +161,11 @@ def test_find_continuous_intervals(args, expected):
             pd.IntervalIndex.from_tuples([(1, 6)]),
             id="nonzero_threshold",
         ),
+        pytest.param(
+            (pd.IntervalIndex.from_tuples([(0, 10), (1, 2), (3, 4), (5, 6)]),),
+            pd.IntervalIndex.from_tuples([(0, 10)]),
+            id="nested_intervals",
+        ),
         pytest.param(
             (
                 pd.IntervalIndex.from_arrays(
@@ -276,6 +296,20 @@ def test_add_interval(self, other, expected):
             pd.IntervalIndex.from_tuples([(10, 15), (75, 80)]),
             id="multiple_intervals",
         ),
+        pytest.param(
+            pd.IntervalIndex.from_arrays(
+                pd.DatetimeIndex([10, 40], tz="Europe/Oslo"),
+                pd.DatetimeIndex([20, 50], tz="Europe/Oslo"),
+                closed="left",
+            ),
+            pd.Interval(pd.Timestamp(15, tz="Europe/Oslo"), pd.Timestamp(45, tz="Europe/Oslo"), closed="left"),
+            pd.IntervalIndex.from_arrays(
+                pd.DatetimeIndex([10, 45], tz="Europe/Oslo"),
+                pd.DatetimeIndex([15, 50], tz="Europe/Oslo"),
+                closed="left",
+            ),
+            id="maintains_dtype",
+        ),
     ],
 )
 def test_subtract_interval(self, other, expected):
@@ -345,27 +379,217 @@ def test_subtract_interval(self, other, expected):
             ],
             id="inner_overlap",
         ),
+        pytest.param(
+            [
+                ("id", "2022-01-10", "2022-01-20"),
+                (["id", "newid"], "2022-01-10", "2022-01-20"),
+            ],
+            [
+                ("id", pd.Timestamp("2022-01-10"), pd.Timestamp("2022-01-20")),
+                ("newid", pd.Timestamp("2022-01-10"), pd.Timestamp("2022-01-20")),
+            ],
+            id="multiple_ids",
+        ),
     ],
 )
-def test_with_interval_cache(mocker: MockerFixture, args_list, expected):
-    def get_data(id, start_time, end_time):
+def test_with_interval_cache(args_list, expected):
+    calls = []
+
+    def get_data(*args):
+        calls.append(args)
+        id, start_time, end_time = args
         index = pd.date_range(start_time, end_time, freq=pd.Timedelta("0.8192s"))
         columns = pd.RangeIndex(450, 460)
-        return pd.DataFrame(0, index, columns)
+        # Zeroed memory is allocated lazily, so only the rows that are read are touched
+        return pd.DataFrame(np.zeros((len(index), len(columns)), dtype=np.int64), index, columns, copy=False)
+
+    get_data_with_cache = with_interval_cache(get_data)
+
+    for args in args_list:
+        get_data_with_cache(*args)
+
+    assert calls == expected
+
+
+@pytest.mark.parametrize(
+    "cached",
+    [
+        pytest.param([], id="empty_cache"),
+        pytest.param([("id", "2022-01-01", "2022-01-05")], id="cached_elsewhere"),
+        pytest.param([("id", "2022-01-01", "2022-01-20")], id="cached_around"),
+    ],
+)
+def test_with_interval_cache__empty_interval__should_not_fetch(cached):
+    calls = []
+
+    def get_data(*args):
+        calls.append(args)
+        index = pd.date_range(args[1], args[2], freq="1D", inclusive="left")
+        return pd.DataFrame({"day": index.day}, index)
+
+    get_data_with_cache = with_interval_cache(get_data)
+    for args in cached:
+        get_data_with_cache(*args)
+
+    get_data_with_cache("id", "2022-01-10", "2022-01-10")
+
+    assert len(calls) == len(cached)
+
+
+def test_with_interval_cache__should_return_cached_data():
+    def get_data(id, start_time, end_time):
+        index = pd.date_range(start_time, end_time, freq="1D", inclusive="left")
+        return pd.DataFrame({"day": index.day}, index)
+
+    get_data_with_cache = with_interval_cache(get_data)
+
+    get_data_with_cache("id", "2022-01-10", "2022-01-20")
+    get_data_with_cache("id", "2022-01-01", "2022-01-05")
+    result = get_data_with_cache("id", "2022-01-01", "2022-01-30")
+
+    expected = get_data("id", pd.Timestamp("2022-01-01"), pd.Timestamp("2022-01-30"))
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
+
+
+def test_with_interval_cache__max_rows__should_evict_least_recently_used(mocker: MockerFixture):
+    def get_data(id, start_time, end_time):
+        index = pd.date_range(start_time, end_time, freq="1D", inclusive="left")
+        return pd.DataFrame(0, index, pd.RangeIndex(450, 460))
+
+    get_data_mock = mocker.MagicMock()
+    get_data_mock.side_effect = get_data
+
+    get_data_with_cache = with_interval_cache(max_rows=15)(get_data_mock)
+
+    get_data_with_cache("a", "2022-01-01", "2022-01-11")
+    get_data_with_cache("b", "2022-01-01", "2022-01-11")
+    get_data_with_cache("b", "2022-01-01", "2022-01-11")
+    get_data_with_cache("a", "2022-01-01", "2022-01-11")
+
+    result = [call[0][0] for call in get_data_mock.call_args_list]
+
+    assert result == ["a", "b", "a"]
+
+
+def test_with_interval_cache__max_rows__should_skip_requested_ids():
+    fetching, release = threading.Event(), threading.Event()
+    calls = []
+
+    def get_data(id, start_time, end_time):
+        calls.append(id)
+        if id == "b":
+            fetching.set()
+            release.wait()
+        index = pd.date_range(start_time, end_time, freq="1D", inclusive="left")
+        return pd.DataFrame(0, index, pd.RangeIndex(450, 460))
+
+    get_data_with_cache = with_interval_cache(max_rows=15)(get_data)
+
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        future = executor.submit(get_data_with_cache, ["a", "b"], "2022-01-01", "2022-01-11")
+        fetching.wait()
+        # Cached after "a", which is therefore the least recently used id
+        get_data_with_cache("x", "2022-01-01", "2022-01-03")
+        get_data_with_cache("y", "2022-01-01", "2022-01-03")
+        release.set()
+        future.result()
+    get_data_with_cache("x", "2022-01-01", "2022-01-03")
+
+    assert calls == ["a", "b", "x", "y", "x"]
+
+
+def test_with_interval_cache__concurrent_requests__should_fetch_once(mocker: MockerFixture):
+    def get_data(id, start_time, end_time):
+        time.sleep(0.1)
+        index = pd.date_range(start_time, end_time, freq="1D", inclusive="left")
+        return pd.DataFrame(0, index, pd.RangeIndex(450, 460))
 
     get_data_mock = mocker.MagicMock()
     get_data_mock.side_effect = get_data
 
     get_data_with_cache = with_interval_cache(get_data_mock)
 
-    for args in args_list:
-        get_data_with_cache(*args)
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(get_data_with_cache, "id", "2022-01-01", "2022-01-11") for _ in range(4)]
+        results = [future.result() for future in futures]
 
-    result = get_data_mock.call_args_list
+    assert get_data_mock.call_count == 1
+    for result in results:
+        pd.testing.assert_frame_equal(result, results[0])
 
-    assert len(result) == len(expected)
-    for r, e in zip(result, expected):
-        assert r[0] == e
+
+def test_with_interval_cache__evicted_during_fetch__should_count_stored_rows():
+    fetching, release = threading.Event(), threading.Event()
+    calls = []
+
+    def get_data(id, start_time, end_time):
+        calls.append((id, start_time, end_time))
+        if id == "a" and start_time == pd.Timestamp("2022-01-04"):
+            fetching.set()
+            release.wait()
+        index = pd.date_range(start_time, end_time, freq="1D", inclusive="left")
+        return pd.DataFrame(0, index, pd.RangeIndex(450, 460))
+
+    get_data_with_cache = with_interval_cache(max_rows=8)(get_data)
+
+    get_data_with_cache("a", "2022-01-01", "2022-01-04")
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        future = executor.submit(get_data_with_cache, "a", "2022-01-01", "2022-01-08")
+        fetching.wait()
+        # Evicts the 3 rows of "a" while the next 4 rows are being fetched
+        get_data_with_cache("b", "2022-01-01", "2022-01-07")
+        release.set()
+        future.result()
+    # The 7 rows stored for "a" and these 2 rows exceed the limit, so "a" is evicted
+    get_data_with_cache("c", "2022-01-01", "2022-01-03")
+    get_data_with_cache("a", "2022-01-01", "2022-01-08")
+
+    assert calls[-1] == ("a", pd.Timestamp("2022-01-01"), pd.Timestamp("2022-01-08"))
+
+
+def test_with_interval_cache__evicted_during_fetch__should_fetch_once():
+    fetching, release = threading.Event(), threading.Event()
+    active, max_active = [], []
+
+    def get_data(id, start_time, end_time):
+        if id == "a":
+            active.append(start_time)
+            max_active.append(len(active))
+            if start_time == pd.Timestamp("2022-01-04"):
+                fetching.set()
+                release.wait()
+            active.remove(start_time)
+        index = pd.date_range(start_time, end_time, freq="1D", inclusive="left")
+        return pd.DataFrame(0, index, pd.RangeIndex(450, 460))
+
+    get_data_with_cache = with_interval_cache(max_rows=5)(get_data)
+
+    get_data_with_cache("a", "2022-01-01", "2022-01-04")
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        first = executor.submit(get_data_with_cache, "a", "2022-01-01", "2022-01-08")
+        fetching.wait()
+        # Evicts "a" while its remaining rows are being fetched
+        get_data_with_cache("b", "2022-01-01", "2022-01-11")
+        second = executor.submit(get_data_with_cache, "a", "2022-01-01", "2022-01-08")
+        time.sleep(0.1)
+        release.set()
+        results = [first.result(), second.result()]
+
+    assert max(max_active) == 1
+    pd.testing.assert_frame_equal(results[1], results[0])
+
+
+def test_get_max_cached_rows(mocker: MockerFixture):
+    mocker.patch.dict(os.environ, {"INTERVAL_CACHE_MAX_ROWS": "15"})
+
+    assert _get_max_cached_rows() == 15
+
+
+def test_get_max_cached_rows__malformed__should_use_default(mocker: MockerFixture):
+    mocker.patch.dict(os.environ, {"INTERVAL_CACHE_MAX_ROWS": "many"})
+
+    with pytest.warns(UserWarning):
+        assert _get_max_cached_rows() == 10_000_000
 
 
 @pytest.mark.parametrize(
@@ -484,6 +708,18 @@ def test_with_interval_cache(mocker: MockerFixture, args_list, expected):
             ),
             id="noncontinuous_datetime_timezone",
         ),
+        pytest.param(
+            pd.IntervalIndex.from_arrays(
+                left=pd.DatetimeIndex([10e9, 12e9]),
+                right=pd.DatetimeIndex([10e9, 13e9]),
+            ),
+            dict(
+                left=[10e9, 12e9],
+                right=[10e9, 13e9],
+                dtype="interval[datetime64[ns], right]",
+            ),
+            id="empty_first_interval",
+        ),
     ],
 )
 def test_serialize_interval_index(input, expected):
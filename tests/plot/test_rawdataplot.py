@@ -0,0 +1,27 @@
+import matplotlib
+import numpy as np
+import pandas as pd
+import pytest
+
+from fiberoptics.common.plot import rawdataplot
+
+matplotlib.use("Agg")
+
+
+@pytest.mark.parametrize("unit", ["ns", "us", "ms", "s"])
+@pytest.mark.parametrize("tz", [None, "UTC"])
+def test_rawdataplot__resample(unit, tz):
+    # Arrange
+    import matplotlib.pyplot as plt
+
+    index = pd.date_range("2023-08-21", periods=10, freq="1s", unit=unit, tz=tz).delete(4)
+    df = pd.DataFrame(np.random.default_rng(0).random((len(index), 5)), index=index)
+    _, ax = plt.subplots()
+
+    # Act
+    rawdataplot(df, ax=ax)
+
+    # Assert
+    # The missing sample is filled back in at the smallest gap of the index
+    assert ax.images[0].get_array().shape == (5, 10)
+    plt.close("all")
@@ -1,6 +1,5 @@
 import math
 from datetime import datetime, timedelta
-from functools import reduce
 
 import numpy as np
 import pandas as pd
@@ -33,27 +32,15 @@ def test_depth_aggregation(start: int, end: int, aggregation_window: int, top_le
     # Generate the index with IntervalIndex
     start_time = datetime(2023, 8, 21, 0, 0, 0)
     end_time = start_time + interval_length * num_intervals
-    index = pd.IntervalIndex.from_tuples(
-        [(t, t + interval_length) for t in pd.date_range(start_time, end_time - interval_length, freq=interval_length)],
-        closed="left",
-    )
+    index = pd.interval_range(start=start_time, end=end_time, freq=interval_length, closed="left")
 
     # Create the DataFrame with random data
-    data = np.random.rand(len(index), len(columns))
+    data = np.random.default_rng(0).random((len(index), len(columns)))
     df = pd.DataFrame(data, index=index, columns=columns)
 
     # Act
     aggregated_df = depth_aggregation(df, aggregation_window=aggregation_window)
-    grouped = df.groupby(level=0, axis=1)
-    grouped_dfs = [grouped.get_group(group_name) for group_name in grouped.groups]
-    expected = reduce(
-        lambda acc, obj: acc + obj,
-        map(
-            lambda x: math.ceil(len(x.columns.levels[1]) / aggregation_window),
-            grouped_dfs,
-        ),
-        0,
-    )
+    expected = top_level_length * math.ceil(len(loci_range) / aggregation_window)
 
     # Assert
     assert expected == len(aggregated_df.columns)
@@ -77,13 +64,10 @@ def test_depth_aggregation_no_multiindex(start: int, end: int, aggregation_windo
     # Create the index with IntervalIndex
     start_time = datetime(2023, 8, 21, 0, 0, 0)
     end_time = start_time + interval_length * num_intervals
-    index = pd.IntervalIndex.from_tuples(
-        [(t, t + interval_length) for t in pd.date_range(start_time, end_time - interval_length, freq=interval_length)],
-        closed="left",
-    )
+    index = pd.interval_range(start=start_time, end=end_time, freq=interval_length, closed="left")
 
     # Create the DataFrame with random data and "loci" columns
-    data = np.random.rand(len(index), len(loci_range))
+    data = np.random.default_rng(0).random((len(index), len(loci_range)))
     df = pd.DataFrame(data, index=index, columns=loci_range)
 
     # Act
@@ -92,3 +76,32 @@ def test_depth_aggregation_no_multiindex(start: int, end: int, aggregation_windo
 
     # Assert
     assert expected == len(aggregated_df.columns)
+
+
+@pytest.mark.parametrize("aggregation_function", ["mean", "sum", "min", "max", "median"])
+@pytest.mark.parametrize(
+    "with_nan,shuffle",
+    [
+        pytest.param(False, False, id="sorted"),
+        pytest.param(True, False, id="sorted_with_nan"),
+        pytest.param(False, True, id="shuffled"),
+    ],
+)
+def test_depth_aggregation__matches_groupby(aggregation_function: str, with_nan: bool, shuffle: bool):
+    # Arrange
+    rng = np.random.default_rng(0)
+    columns = pd.MultiIndex.from_product([["feature0", "feature1"], range(10, 57)], names=["featureId", "loci"])
+    data = rng.random((20, len(columns)))
+    if with_nan:
+        data[rng.random(data.shape) < 0.2] = np.nan
+    df = pd.DataFrame(data, columns=columns)
+    if shuffle:
+        df = df.iloc[:, rng.permutation(len(columns))]
+    keys = [df.columns.get_level_values(0), (df.columns.get_level_values(1) // 5) * 5]
+
+    # Act
+    result = depth_aggregation(df, aggregation_window=5, aggregation_function=aggregation_function)
+    expected = getattr(df.T.groupby(keys), aggregation_function)().T
+
+    # Assert
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.signal
+
+from fiberoptics.common.processing import low_cut_filter
+
+
+@pytest.mark.parametrize(
+    "shape,numtaps",
+    [
+        pytest.param((1000, 10), 15, id="short_filter"),
+        pytest.param((1000, 10), 100, id="long_filter"),
+        pytest.param((50, 10), 101, id="filter_longer_than_data"),
+    ],
+)
+def test_low_cut_filter(shape: tuple, numtaps: int):
+    # Arrange
+    data = np.random.rand(*shape)
+    df = pd.DataFrame(data, index=pd.date_range("2023-08-21", periods=shape[0], freq="100us"), columns=np.arange(shape[1]))
+
+    # Act
+    result = low_cut_filter(df, numtaps, cutoff=50)
+    window = scipy.signal.firwin(numtaps | 1, 50, pass_zero=False, fs=10000)
+    expected = df.apply(lambda x: scipy.signal.convolve(x, window, mode="same"))
+
+    # Assert
+    pd.testing.assert_frame_equal(result, expected)
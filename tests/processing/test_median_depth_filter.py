@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fiberoptics.common.processing import median_depth_filter
+
+
+@pytest.mark.parametrize("length", [1, 2, 3, 4, 7, 50])
+def test_median_depth_filter(length: int):
+    # Arrange
+    data = np.random.rand(100, 20)
+    data[np.random.rand(*data.shape) < 0.1] = np.nan
+    data[5, :10] = np.nan  # Windows without any values
+    df = pd.DataFrame(data, index=pd.date_range("2023-08-21", periods=100, freq="1s"), columns=np.arange(20) * 1.02)
+
+    # Act
+    result = median_depth_filter(df, length)
+    expected = df.T.rolling(length, center=True, min_periods=1).median().T
+
+    # Assert
+    pd.testing.assert_frame_equal(result, expected)
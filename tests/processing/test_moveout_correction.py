@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fiberoptics.common.processing import moveout_correction
+
+
+@pytest.mark.parametrize(
+    "channel,moveout",
+    [
+        pytest.param(10, 0, id="no_moveout"),
+        pytest.param(10, 2, id="positive_moveout"),
+        pytest.param(10, -1.5, id="negative_fractional_moveout"),
+        pytest.param(0, 30, id="shift_beyond_data"),
+    ],
+)
+def test_moveout_correction(channel: int, moveout: float):
+    # Arrange
+    data = np.random.rand(100, 20).astype(np.float32)
+    df = pd.DataFrame(data, index=pd.date_range("2023-08-21", periods=100, freq="100us"), columns=np.arange(20))
+
+    # Act
+    result = moveout_correction(df, channel, moveout)
+    expected = df.apply(lambda col: col.shift(int(abs(col.name - channel) * moveout)))
+
+    # Assert
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import signal
+
+from fiberoptics.common.processing import resample_raw_data
+
+
+@pytest.mark.parametrize(
+    "dtype,rtol",
+    [
+        pytest.param(np.float64, 1e-12, id="float64"),
+        pytest.param(np.float32, 1e-5, id="float32"),
+        pytest.param(np.int16, 1e-12, id="int16"),
+    ],
+)
+@pytest.mark.parametrize("dec", [1, 2, 4, 8, 16])
+def test_resample_raw_data(dec, dtype, rtol):
+    # Arrange
+    data = (np.random.default_rng(0).normal(size=(1000, 20)) * 1000).astype(dtype)
+    df = pd.DataFrame(data, index=pd.date_range("2023-08-21", periods=1000, freq="1ms"), columns=np.arange(20) * 1.02)
+
+    # Act
+    result = resample_raw_data(df, dec)
+    # Integer data is filtered as floating point, instead of with a filter truncated to zeros
+    values = df.values if df.values.dtype.kind == "f" else df.values.astype(np.float64)
+    expected = signal.resample_poly(values, 1, dec, axis=0, window=10)
+
+    # Assert
+    assert result.index.equals(df.index[::dec])
+    assert result.columns.equals(df.columns)
+    np.testing.assert_allclose(result.to_numpy(), expected, rtol=rtol, atol=rtol)
@@ -2,20 +2,23 @@ from datetime import datetime, timedelta
 
 import numpy as np
 import pandas as pd
+import pytest
 
 from fiberoptics.common.processing import split_around_gaps
 
 
-def test_split_around_gaps():
+@pytest.mark.parametrize("tz", [None, "UTC", "Europe/Oslo"])
+def test_split_around_gaps(tz):
     # Arrange
     # Generate example data
     num_intervals = 10000
     interval_length = timedelta(minutes=1)
     loci_range = range(0, 2)
+    rng = np.random.default_rng(0)
 
     # Generate random gaps in the index
     # But make sure they will never overlap
-    gap_indices = [np.random.randint(i * 1000, (i + 1) * 1000 - 100) for i in range(0, 5)]
+    gap_indices = [int(rng.integers(i * 1000, (i + 1) * 1000 - 100)) for i in range(0, 5)]
     gap_indices.sort()
 
     # Create the multiindex column
@@ -26,18 +29,14 @@ def test_split_around_gaps():
 
     # Generate the index with IntervalIndex
     start_time = datetime(2023, 8, 21, 0, 0, 0)
-    index = []
-    current_time = start_time
-    for i in range(num_intervals):
-        index.append((current_time, current_time + interval_length))
-        current_time += interval_length
-        if i in gap_indices:
-            current_time += timedelta(minutes=np.random.randint(2, 5))  # Add a random gap
-
-    index = pd.IntervalIndex.from_tuples(index, closed="left")
+    gap_minutes = np.zeros(num_intervals, dtype=np.int64)
+    gap_minutes[gap_indices] = rng.integers(2, 5, size=len(gap_indices))  # Add random gaps
+    steps = interval_length + pd.to_timedelta(gap_minutes[:-1], unit="min")
+    left = pd.Timestamp(start_time, tz=tz) + pd.TimedeltaIndex(np.r_[0, np.cumsum(steps.asi8)])
+    index = pd.IntervalIndex.from_arrays(left, left + interval_length, closed="left")
 
     # Create the DataFrame with random data
-    data = np.random.rand(len(index), len(columns))
+    data = rng.random((len(index), len(columns)), dtype=np.float32)
     df = pd.DataFrame(data, index=index, columns=columns)
 
     # Act
@@ -45,3 +44,4 @@ def test_split_around_gaps():
 
     # Assert
     assert len(result) == len(gap_indices) + 1
+    assert [len(r) for r in result] == np.diff([0, *np.add(gap_indices, 1), num_intervals]).tolist()
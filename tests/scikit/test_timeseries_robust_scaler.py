@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fiberoptics.common.scikit import _MAX_SELECTION_WINDOW, TimeseriesRobustScaler, _rolling_quantiles
+
+
+def _make_data(missing: bool):
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(200, 5))
+    if missing:
+        data[rng.random(data.shape) < 0.05] = np.nan
+        data[10, 0] = np.inf
+        data[50, 1] = -np.inf
+        data[100:103, 2] = [np.inf, np.nan, -np.inf]
+    return pd.DataFrame(data, index=pd.date_range("2023-08-21", periods=200, freq="1s"))
+
+
+@pytest.mark.parametrize("missing", [pytest.param(False, id="finite"), pytest.param(True, id="nan_and_inf")])
+@pytest.mark.parametrize("center", [True, False])
+@pytest.mark.parametrize("window", [1, 2, 3, 4, 7, 10, _MAX_SELECTION_WINDOW])
+def test_rolling_quantiles(window, center, missing):
+    # Arrange
+    df = _make_data(missing)
+    quantiles = (0.25, 0.5, 0.75)
+
+    # Act
+    result = _rolling_quantiles(df.to_numpy(), window, center, quantiles)
+
+    # Assert
+    for values, q in zip(result, quantiles):
+        expected = df.rolling(window, center=center).quantile(q)
+        np.testing.assert_allclose(values, expected.to_numpy(), rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("missing", [pytest.param(False, id="finite"), pytest.param(True, id="nan_and_inf")])
+@pytest.mark.parametrize(
+    "args,kwargs",
+    [
+        pytest.param((4,), dict(center=True), id="even"),
+        pytest.param((7,), dict(center=True), id="odd"),
+        pytest.param((_MAX_SELECTION_WINDOW + 1,), dict(center=True), id="above_selection_window"),
+        pytest.param((7,), dict(center=True, min_periods=1), id="min_periods"),
+        pytest.param(("10s",), dict(), id="time_window"),
+    ],
+)
+def test_timeseries_robust_scaler(args, kwargs, missing):
+    # Arrange
+    df = _make_data(missing)
+
+    # Act
+    result = TimeseriesRobustScaler(*args, **kwargs).fit_transform(df)
+
+    # Assert
+    rolling = df.rolling(*args, **kwargs)
+    q25, q50, q75 = (rolling.quantile(q) for q in (0.25, 0.5, 0.75))
+    expected = (df - q50) / (q75 - q25)
+    pd.testing.assert_frame_equal(result, expected, rtol=1e-12, atol=1e-12)